@@ -1,4 +1,5 @@
 import os
+import functools
 import google.generativeai as genai
 from dotenv import load_dotenv
 
@@ -21,6 +22,9 @@ def init_openai() -> dict:
     provider = "gpt-4o-mini"
     return {"provider": provider, "api_key": OPENAI_API_KEY}
 
+# Cached so each provider is set up (and Gemini models listed) once per process.
+# The returned dict is shared between callers and must not be modified.
+@functools.lru_cache(maxsize=None)
 def initialize_model(provider: str = "gemini"):
     if provider.lower() == "gemini":
         models = find_gemini_models()
@@ -1,6 +1,7 @@
 import sys
 import os
 import asyncio
+import weakref
 
 # Add the parent directory to the Python path to allow for absolute imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -23,6 +24,18 @@ from createArticles.contentGeneration.db_operations import (
     mark_articles_as_processed
 )
 
+# Each extraction starts a crawler browser, so only this many run at once
+# across all groups. One semaphore per event loop.
+EXTRACT_CONCURRENCY = 4
+_EXTRACT_SEMAPHORES = weakref.WeakKeyDictionary()
+
+def _extract_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _EXTRACT_SEMAPHORES.get(loop)
+    if semaphore is None:
+        semaphore = _EXTRACT_SEMAPHORES[loop] = asyncio.Semaphore(EXTRACT_CONCURRENCY)
+    return semaphore
+
 async def extract_article_content(article):
     """
     Extract content from an article URL.
@@ -37,7 +50,8 @@ async def extract_article_content(article):
     url = article["url"] if article["url"].startswith("http") else "https://www." + article["url"]
     
     print(f"Extracting content from {url} (Article ID: {article_id})")
-    content = await extract_main_content(url)
+    async with _extract_semaphore():
+        content = await extract_main_content(url)
     
     # Fetch related background articles
     related_dict = await process_source_article(str(article_id), content)
@@ -71,35 +85,43 @@ async def process_content(article_group):
             existing_article = article
             break
     
-    # Process each article in the group
-    for article in article_group:
+    async def process_article(article):
+        """
+        Content, related articles and keywords of one article in the group.
+        
+        Returns:
+            tuple: (text to add to the combined content, related_articles, keywords)
+        """
         # Skip content extraction for existing articles as we already have their content
         if "Status" in article:
-            combined_content += article.get("EnglishArticle", "") + "\n"
-            continue
+            return article.get("EnglishArticle", "") + "\n", [], []
         
-        # Extract content and related articles
+        # Add existing keywords if available
+        keywords = list(article.get("keywords") or [])
+        
+        # Summary keywords do not depend on the page, so they are extracted
+        # while the content and related articles are fetched
+        summary = article.get("summary")
+        summary_task = asyncio.create_task(extract_keywords_from_summary(summary)) if summary else None
         content, related_articles = await extract_article_content(article)
+        if summary_task:
+            keywords.extend(await summary_task)
+        
+        if not content:
+            return "", [], keywords
         
-        if content:
-            combined_content += content + "\n"
-            combined_related.extend(related_articles)
-            
-        # Extract keywords from various sources
-        if isinstance(article, dict):
-            # Add existing keywords if available
-            if "keywords" in article and article["keywords"]:
-                combined_keywords.update(article["keywords"])
-                
-            # Extract keywords from summary
-            if "summary" in article and article["summary"]:
-                summary_keywords = await extract_keywords_from_summary(article["summary"])
-                combined_keywords.update(summary_keywords)
-                
-            # Extract keywords from content
-            if content:
-                content_keywords = await extract_keywords_from_content(content)
-                combined_keywords.update(content_keywords)
+        # Extract keywords from content
+        keywords.extend(await extract_keywords_from_content(content))
+        return content + "\n", related_articles, keywords
+    
+    # Articles in a group do not depend on each other, so they are processed
+    # concurrently; results are combined in group order
+    for text, related_articles, keywords in await asyncio.gather(
+        *(process_article(article) for article in article_group)
+    ):
+        combined_content += text
+        combined_related.extend(related_articles)
+        combined_keywords.update(keywords)
     
     # Skip if no content was extracted
     if not combined_content.strip():
@@ -37,7 +37,7 @@ async def create_new_article(representative_article, english_data, german_data,
     
     if new_record_id:
         # Run review on the new article to ensure it passes validation
-        review_passed = await review_article_fields(new_record_id, representative_article["uniqueName"])
+        review_passed = await review_article_fields(new_record_id, representative_article["uniqueName"], supabase=supabase_client)
         if review_passed:
             return new_record_id
         else:
@@ -80,7 +80,7 @@ async def update_existing_article(existing_article_id, english_data, german_data
         
         # Run review on the updated article to ensure it passes validation
         article_name = str(existing_article_id)
-        review_passed = await review_article_fields(existing_article_id, article_name)
+        review_passed = await review_article_fields(existing_article_id, article_name, supabase=supabase_client)
         return review_passed
     except Exception as e:
         print(f"Error updating existing article: {e}")
@@ -1,5 +1,8 @@
 from createArticles.dataPrep.similarity import (
     cosine_similarity, 
+    similarity_matrix,
+    load_processed_articles,
+    add_processed_articles,
     check_for_similar_articles,
     check_processed_articles_similarity
 )
@@ -11,6 +14,9 @@ from createArticles.dataPrep.article_grouping import (
 
 __all__ = [
     'cosine_similarity',
+    'similarity_matrix',
+    'load_processed_articles',
+    'add_processed_articles',
     'check_for_similar_articles',
     'check_processed_articles_similarity',
     'group_similar_articles',
@@ -1,12 +1,14 @@
 import sys
 import os
 import asyncio
+import numpy as np
 
 # Add the parent directory to the Python path to allow for absolute imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from createArticles.dataPrep.similarity import cosine_similarity, check_for_similar_articles
+from createArticles.dataPrep.similarity import similarity_matrix, check_for_similar_articles, add_processed_articles
 from createArticles.storeInDB import mark_article_as_processed
+from createArticles.embedding_utils import connected_components
 # Import from our new contentGeneration package
 from createArticles.contentGeneration import process_content
 
@@ -14,66 +16,42 @@ def group_similar_articles(new_articles: list, existing_articles: list, threshol
     """
     Group articles based on the similarity of their embedding vectors.
     Now handles both new and existing articles, creating groups that may contain both.
+    
+    New articles are grouped transitively: if A is similar to B and B to C,
+    all three share a group. Each group then takes at most one existing
+    article, the first one any of its members is similar to, and each
+    existing article goes to one group only.
     """
-    groups = []
-    visited = set()
+    # All similarities up front: one matrix product against existing articles
+    # and one among the new ones, instead of a cosine call per pair
+    new_vs_existing = similarity_matrix(new_articles, existing_articles)
+    new_vs_new = similarity_matrix(new_articles, new_articles)
     
-    # First, try to match new articles with existing ones
-    for new_article in new_articles:
-        new_id = new_article["id"]
-        if new_id in visited:
-            continue
-            
-        group = [new_article]
-        visited.add(new_id)
+    # Similar pairs of new articles, each pair once
+    edges = np.argwhere(np.triu(new_vs_new > threshold, 1))
+    
+    groups = []
+    taken = set()
+    for members in connected_components(len(new_articles), edges):
+        group = [new_articles[i] for i in members]
         
-        # Check against existing articles first
-        for existing in existing_articles:
-            existing_id = existing["id"]
-            if existing_id in visited:
-                continue
-                
-            vec1 = new_article.get("embedding", [])
-            vec2 = existing.get("embedding", [])
-            if not vec1 or not vec2:
-                continue
-                
-            sim = cosine_similarity(vec1, vec2)
-            if sim > threshold:
-                group.append(existing)
-                visited.add(existing_id)
+        # Existing articles similar to any member, in order; the first one not
+        # already in another group is updated with this group's content
+        for j in np.flatnonzero((new_vs_existing[members] > threshold).any(axis=0)):
+            if j not in taken:
+                taken.add(j)
+                group.insert(1, existing_articles[j])
                 break  # Only match with one existing article
-                
-        # Then check against other new articles
-        for other in new_articles:
-            other_id = other["id"]
-            if other_id in visited:
-                continue
-                
-            vec1 = new_article.get("embedding", [])
-            vec2 = other.get("embedding", [])
-            if not vec1 or not vec2:
-                continue
-                
-            sim = cosine_similarity(vec1, vec2)
-            if sim > threshold:
-                group.append(other)
-                visited.add(other_id)
-                
+        
         groups.append(group)
     
-    # Handle remaining new articles that weren't grouped
-    for new_article in new_articles:
-        if new_article["id"] not in visited:
-            groups.append([new_article])
-            visited.add(new_article["id"])
-    
     return groups
 
-async def process_article_group(article_group: list):
+async def process_article_group(article_group: list, processed_articles: list = None):
     """
     Process a group of similar articles by combining their content and related background articles.
-    Now handles updating existing articles.
+    Now handles updating existing articles. Pass `processed_articles` from
+    load_processed_articles() to share one fetch of them across groups.
     
     Returns:
         tuple: (processed_news_result_ids, news_article_ids) - Lists containing the IDs of processed NewsResults and corresponding NewsArticles
@@ -81,7 +59,7 @@ async def process_article_group(article_group: list):
     # Check if there's an exact similar article first - this should take precedence
     for article in article_group:
         if "Status" not in article:  # This is a new article
-            is_similar = await check_for_similar_articles(article)
+            is_similar = await check_for_similar_articles(article, processed_articles)
             if is_similar:
                 print(f"Article {article['uniqueName']} was processed by similarity check, skipping normal processing.")
                 # Mark all articles in the group as processed
@@ -92,4 +70,13 @@ async def process_article_group(article_group: list):
     
     # Use the new content processing pipeline from contentGeneration package
     # Will return both processed NewsResult IDs and created/updated NewsArticle IDs
-    return await process_content(article_group)
\ No newline at end of file
+    processed_ids, news_article_ids = await process_content(article_group)
+    
+    # Later groups in this run should find the articles just written
+    if processed_articles is not None and processed_ids:
+        done = set(processed_ids)
+        await add_processed_articles(
+            processed_articles,
+            [a for a in article_group if "Status" not in a and a["id"] in done]
+        )
+    return processed_ids, news_article_ids
\ No newline at end of file
@@ -1,77 +1,181 @@
-import math
 import sys
 import os
 import asyncio
+import weakref
+from collections import OrderedDict
+import numpy as np
 
 # Add the parent directory to the Python path to allow for absolute imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from supabase_init import SupabaseClient
 from createArticles.review import check_similarity_and_update
+from createArticles.review.similarity import _decode_embeddings
+
+# NewsResults columns the per-article similarity check reads
+PROCESSED_COLUMNS = "id,uniqueName,embedding"
+
+# Held while check_similarity_and_update runs for one article's group; one
+# lock per event loop, since the module can outlive a loop
+_SIMILARITY_UPDATE_LOCKS = weakref.WeakKeyDictionary()
+
+def _similarity_update_lock() -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    lock = _SIMILARITY_UPDATE_LOCKS.get(loop)
+    if lock is None:
+        lock = _SIMILARITY_UPDATE_LOCKS[loop] = asyncio.Lock()
+    return lock
 
 def cosine_similarity(vec1: list, vec2: list) -> float:
     """Compute the cosine similarity between two vectors."""
-    dot = sum(a * b for a, b in zip(vec1, vec2))
-    norm1 = math.sqrt(sum(a * a for a in vec1))
-    norm2 = math.sqrt(sum(b * b for b in vec2))
-    if norm1 == 0 or norm2 == 0:
+    a = np.asarray(vec1, dtype=np.float32)
+    b = np.asarray(vec2, dtype=np.float32)
+    norms_squared = np.vdot(a, a) * np.vdot(b, b)
+    if norms_squared == 0:
         return 0.0
-    return dot / (norm1 * norm2)
+    return float(np.dot(a, b) / np.sqrt(norms_squared))
+
+# Unit embeddings already computed, keyed by article id. Kept beside the
+# articles rather than on them, so the dicts stay plain JSON rows. An entry
+# holds the embedding list it was computed from and is only used while the
+# article still carries that same list. Least recently used entries are
+# dropped once there are _UNIT_EMBEDDINGS_MAX of them.
+_UNIT_EMBEDDINGS = OrderedDict()
+_UNIT_EMBEDDINGS_MAX = 20000
+
+def embedding_array(article: dict) -> np.ndarray:
+    """Return the article's embedding as a float32 array."""
+    return np.asarray(article["embedding"], dtype=np.float32)
+
+def unit_embedding(article: dict) -> np.ndarray:
+    """
+    Return the article's embedding scaled to unit length (a zero vector stays
+    zero), computing it only the first time per article. Cosine similarity of
+    two unit embeddings is their dot product.
+    """
+    article_id = article.get("id")
+    embedding = article["embedding"]
+    cached = _UNIT_EMBEDDINGS.get(article_id)
+    if cached is not None and cached[0] is embedding:
+        _UNIT_EMBEDDINGS.move_to_end(article_id)
+        return cached[1]
+    vector = embedding_array(article)
+    norm = np.linalg.norm(vector)
+    unit = vector / norm if norm else vector
+    if article_id is not None:
+        _UNIT_EMBEDDINGS[article_id] = (embedding, unit)
+        _UNIT_EMBEDDINGS.move_to_end(article_id)
+        if len(_UNIT_EMBEDDINGS) > _UNIT_EMBEDDINGS_MAX:
+            _UNIT_EMBEDDINGS.popitem(last=False)
+    return unit
 
-async def check_for_similar_articles(unprocessed_article):
+def similarity_matrix(articles_a: list, articles_b: list) -> np.ndarray:
+    """
+    Cosine similarity of every article in articles_a against every article in
+    articles_b, with one matrix product per embedding dimension.
+    
+    Returns:
+        float32 array of shape (len(articles_a), len(articles_b)). Pairs where
+        an article has no embedding, or the dimensions differ, are -inf so they
+        never pass a threshold.
+    """
+    # PostgREST returns pgvector columns as text; decode them in place once
+    _decode_embeddings(articles_a)
+    _decode_embeddings(articles_b)
+    scores = np.full((len(articles_a), len(articles_b)), -np.inf, dtype=np.float32)
+    
+    def by_dimension(articles):
+        groups = {}
+        for index, article in enumerate(articles):
+            embedding = article.get("embedding")
+            if embedding:
+                groups.setdefault(len(embedding), []).append(index)
+        return groups
+    
+    groups_b = by_dimension(articles_b)
+    for dim, rows in by_dimension(articles_a).items():
+        cols = groups_b.get(dim)
+        if not cols:
+            continue
+        a = np.stack([unit_embedding(articles_a[i]) for i in rows])
+        b = np.stack([unit_embedding(articles_b[j]) for j in cols])
+        scores[np.ix_(rows, cols)] = a @ b.T
+    return scores
+
+def load_processed_articles(supabase=None) -> list:
+    """
+    Fetch the processed NewsResults that check_for_similar_articles compares
+    against, once, so every group can reuse them.
+    """
+    if supabase is None:
+        supabase = SupabaseClient()
+    response = supabase.client.table("NewsResults").select(PROCESSED_COLUMNS).eq("isProcessed", True).execute()
+    processed_articles = response.data or []
+    _decode_embeddings(processed_articles)
+    return processed_articles
+
+async def add_processed_articles(processed_articles: list, articles: list):
+    """
+    Append NewsResults that have just been processed to a list from
+    load_processed_articles(), so groups that run later compare against them
+    too instead of against the snapshot taken at the start of the run.
+    """
+    columns = PROCESSED_COLUMNS.split(",")
+    async with _similarity_update_lock():
+        processed_articles.extend(
+            {column: article.get(column) for column in columns}
+            for article in articles
+            if article.get("embedding")
+        )
+
+async def check_for_similar_articles(unprocessed_article, processed_articles: list = None):
     """
     Check if there are similar articles to the unprocessed article.
     Returns True if similar articles found and processed, False otherwise.
+    
+    Pass `processed_articles` from load_processed_articles() to skip
+    fetching every processed embedding again for each article.
     """
     print(f"Checking if article {unprocessed_article.get('uniqueName')} has similar processed articles...")
     
     # Run similarity check for just this article
     threshold = 0.89  # Use the same threshold as in run_similarity_check.py
-    supabase = SupabaseClient()
     
     # Get processed news results with embeddings
-    processed_response = supabase.client.table("NewsResults").select("*").eq("isProcessed", True).execute()
-    if not processed_response.data:
+    if processed_articles is None:
+        processed_articles = load_processed_articles()
+    if not processed_articles:
         print("No processed articles to compare against.")
         return False
     
-    processed_articles = processed_response.data
-    
     # Skip articles without embeddings
     if not unprocessed_article.get("embedding"):
         print(f"Article {unprocessed_article.get('uniqueName')} has no embedding, skipping similarity check.")
         return False
     
-    unprocessed_embedding = unprocessed_article.get("embedding")
+    # Find similar processed articles: one row of similarities against all of
+    # them (-inf where there is no embedding or the dimensions differ)
+    try:
+        scores = similarity_matrix([unprocessed_article], processed_articles)[0]
+    except (TypeError, ValueError) as e:
+        print(f"Error calculating similarity: {e}")
+        return False
     
-    # Find similar processed articles
     similar_processed = []
-    for processed in processed_articles:
-        if not processed.get("embedding"):
-            continue
-            
-        processed_embedding = processed.get("embedding")
-        
-        # Verify both embeddings have the same dimensions
-        if len(unprocessed_embedding) != len(processed_embedding):
-            continue
-        
-        # Calculate cosine similarity
-        try:
-            similarity = cosine_similarity(unprocessed_embedding, processed_embedding)
-            if similarity >= threshold:
-                similar_processed.append({
-                    "article": processed,
-                    "similarity": similarity
-                })
-                print(f"Found similar article with similarity score: {similarity:.4f} - ID: {processed.get('uniqueName')}")
-        except Exception as e:
-            print(f"Error calculating similarity: {e}")
-            continue
+    for j in np.flatnonzero(scores >= threshold):
+        processed = processed_articles[j]
+        similarity = float(scores[j])
+        similar_processed.append({
+            "article": processed,
+            "similarity": similarity
+        })
+        print(f"Found similar article with similarity score: {similarity:.4f} - ID: {processed.get('uniqueName')}")
     
     if similar_processed:
         print(f"Found {len(similar_processed)} similar articles to {unprocessed_article.get('uniqueName')}, running update...")
-        # Pass the article's ID to check if it was processed
-        processed_ids = await check_similarity_and_update(threshold=threshold)
+        # Pass the article's ID to check if it was processed. The check covers
+        # every unprocessed article, so concurrent groups take turns running it
+        async with _similarity_update_lock():
+            processed_ids = await check_similarity_and_update(threshold=threshold)
         # Return True if this article ID is in the processed IDs list
         return unprocessed_article.get("id") in processed_ids
     
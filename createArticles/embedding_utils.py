@@ -0,0 +1,117 @@
+"""
+Helpers for comparing article embeddings and grouping the similar ones.
+Only numpy is imported here, so these can be used (and tested) without
+the Supabase and LLM clients the pipeline packages set up on import.
+"""
+
+import numpy as np
+
+def unit_rows(embeddings):
+    """
+    Stack equal-length embeddings into a float32 matrix whose rows have unit
+    length, so cosine similarity becomes a plain dot product. Zero vectors
+    stay zero and therefore score 0 against everything.
+    """
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    matrix /= norms
+    return matrix
+
+def similarity_rows(unprocessed_articles, processed_articles, threshold, tile_rows: int = 512):
+    """
+    Score every unprocessed article with an embedding against every processed
+    one with one matrix product per embedding dimension, tile_rows
+    unprocessed rows at a time. Only scores at or above the threshold are
+    kept, so the full similarity matrix is never held in memory.
+    
+    Returns:
+        Dict mapping an index into unprocessed_articles to a tuple of
+        (indices into processed_articles, float32 similarity scores) for its
+        matches, which may be empty. Pairs that are the same article (see
+        is_same_article) never match. Articles with no processed embedding
+        of the same dimension are left out.
+    """
+    def by_dimension(articles):
+        groups = {}
+        for index, article in enumerate(articles):
+            embedding = article.get("embedding")
+            if embedding:
+                groups.setdefault(len(embedding), []).append(index)
+        return groups
+    
+    processed_groups = by_dimension(processed_articles)
+    
+    # Processed articles by URL and uniqueName, so pairs that are the same
+    # article can be masked out by lookup instead of comparing every pair
+    processed_by_key = {}
+    for index, article in enumerate(processed_articles):
+        for key in ("url", "uniqueName"):
+            value = article.get(key)
+            if value:
+                processed_by_key.setdefault((key, value), []).append(index)
+    
+    rows = {}
+    for dim, unprocessed_indices in by_dimension(unprocessed_articles).items():
+        processed_indices = processed_groups.get(dim)
+        if not processed_indices:
+            continue
+        try:
+            U = unit_rows([unprocessed_articles[i]["embedding"] for i in unprocessed_indices])
+            P = unit_rows([processed_articles[i]["embedding"] for i in processed_indices])
+        except (TypeError, ValueError) as e:
+            print(f"Error calculating similarity for {dim}-dimensional embeddings: {e}")
+            continue
+        position = {p: j for j, p in enumerate(processed_indices)}
+        processed_indices = np.asarray(processed_indices)
+        
+        for start in range(0, len(unprocessed_indices), tile_rows):
+            tile = unprocessed_indices[start:start + tile_rows]
+            scores = U[start:start + len(tile)] @ P.T
+            
+            for row, index in enumerate(tile):
+                # Self-comparisons score -1 so they never reach the threshold
+                unprocessed = unprocessed_articles[index]
+                same = [
+                    position[p]
+                    for key in ("url", "uniqueName")
+                    for p in processed_by_key.get((key, unprocessed.get(key)), ())
+                    if p in position
+                ]
+                if same:
+                    scores[row, same] = -1
+                hits = np.flatnonzero(scores[row] >= threshold)
+                rows[index] = (processed_indices[hits], scores[row, hits])
+    return rows
+
+def is_same_article(unprocessed, processed):
+    """Whether two NewsResults rows are the same article (same URL or uniqueName)."""
+    processed_url = processed.get("url", "")
+    processed_uniquename = processed.get("uniqueName", "")
+    return (processed_url and processed_url == unprocessed.get("url", "")) or \
+        (processed_uniquename and processed_uniquename == unprocessed.get("uniqueName", ""))
+
+def connected_components(count: int, edges) -> list:
+    """
+    Connected components of nodes 0..count-1 joined by `edges`, found with
+    union-find. Each component is sorted, and components are ordered by their
+    smallest node.
+    """
+    parent = list(range(count))
+    
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]  # Path halving
+            i = parent[i]
+        return i
+    
+    for i, j in edges:
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            # The smaller index stays the root, so each root is its component's minimum
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+    
+    components = {}
+    for i in range(count):
+        components.setdefault(find(i), []).append(i)
+    return list(components.values())
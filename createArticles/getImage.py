@@ -21,8 +21,8 @@ from LLMSetup import initialize_model
 dotenv.load_dotenv()
 
 # Initialize OpenAI model
-model_config = initialize_model("openai")
-model_config["model"]["temperature"] = 0.1
+model_config = dict(initialize_model("openai"))
+model_config["model"] = {**model_config["model"], "temperature": 0.1}
 aclient = AsyncOpenAI(api_key=model_config["model"]["api_key"])
 
 # Get the absolute path to the prompts.yaml file in the same directory as this script
@@ -1,9 +1,12 @@
 import os
 import sys
-import json
+import orjson
 import asyncio
-import nest_asyncio
 import random
+import hashlib
+import atexit
+import threading
+import weakref
 from duckduckgo_search import DDGS
 from createArticles.keyword_extractor import KeywordExtractor
 from createArticles.content_extractor import ContentExtractor
@@ -17,8 +20,6 @@ from LLMSetup import initialize_model
 from supabase import create_client, Client
 import openai
 
-nest_asyncio.apply()
-
 # Initialize OpenAI model and API key
 model_info = initialize_model("openai")
 provider = model_info["model_name"]
@@ -79,6 +80,45 @@ def store_cache(keyword: str, embedding: list, result: list):
     except Exception as e:
         print(f"Error storing cache: {e}")
 
+def exact_cache_key(search_query: str) -> str:
+    """Key for keyword_exact_cache: SHA-1 of the normalized search query."""
+    return hashlib.sha1(search_query.strip().lower().encode("utf-8")).hexdigest()
+
+def query_exact_cache(key: str):
+    """Look up a search query by exact key, skipping the embedding round-trip."""
+    try:
+        response = supabase_client.table("keyword_exact_cache").select("result").eq("key", key).limit(1).execute()
+        data = response.data
+        if data and len(data) > 0:
+            return data[0]
+        else:
+            return None
+    except Exception as e:
+        print(f"Error querying exact cache: {e}")
+        return None
+
+def store_exact_cache(key: str, result: list):
+    """Store the result for an exact search query key in Supabase."""
+    try:
+        supabase_client.table("keyword_exact_cache").upsert({"key": key, "result": result}).execute()
+    except Exception as e:
+        print(f"Error storing exact cache: {e}")
+
+# -------------------------------
+# DuckDuckGo Search
+# -------------------------------
+# One client for the whole run instead of a new DDGS() (and HTTP session)
+# per keyword. The client is not thread-safe, so calls from to_thread
+# workers are serialized.
+_DDGS = DDGS()
+_DDGS_LOCK = threading.Lock()
+atexit.register(_DDGS.__exit__, None, None, None)
+
+def ddgs_text_search(query: str, max_results: int = 3) -> list:
+    """Run a DuckDuckGo text search on the shared client."""
+    with _DDGS_LOCK:
+        return list(_DDGS.text(query, max_results=max_results))
+
 # -------------------------------
 # Asynchronous Related Articles Processing with Embedding Caching
 # -------------------------------
@@ -86,120 +126,208 @@ def store_cache(keyword: str, embedding: list, result: list):
 # Defining a global Keyword variable to store a global keyword that well be combined with the extracted keywords to optimize the search 
 GOBAL_KEYWORD = "American Football"
 
+# Caps on simultaneous outbound work: each source article fans out into one
+# search per keyword, so without these limits N articles trigger N*K
+# concurrent DuckDuckGo/HTTP/OpenAI calls and trip rate limits.
+ARTICLE_CONCURRENCY = int(os.environ.get("RELATED_ARTICLE_CONCURRENCY", "8"))
+KEYWORD_CONCURRENCY = int(os.environ.get("RELATED_KEYWORD_CONCURRENCY", "32"))
+# One pair of semaphores per event loop, since the module can outlive a loop
+_SEMAPHORES = weakref.WeakKeyDictionary()
+
+def _semaphores() -> tuple:
+    """(article semaphore, keyword semaphore) for the running event loop."""
+    loop = asyncio.get_running_loop()
+    semaphores = _SEMAPHORES.get(loop)
+    if semaphores is None:
+        semaphores = _SEMAPHORES[loop] = (
+            asyncio.BoundedSemaphore(ARTICLE_CONCURRENCY),
+            asyncio.BoundedSemaphore(KEYWORD_CONCURRENCY)
+        )
+    return semaphores
+
 async def search_background_articles(keyword: str) -> list:
     """
     Searches for background articles using DuckDuckGo for the given keyword.
     First checks the embedding-based cache in Supabase; if a cached result exists, returns it.
     """
-    print(f"Searching background articles for keyword: '{keyword}'")
+    async with _semaphores()[1]:
+        print(f"Searching background articles for keyword: '{keyword}'")
 
-    #combine the global keyword with the extracted keyword to optimize the search
-    search_query = f"{keyword} {GOBAL_KEYWORD}"
+        #combine the global keyword with the extracted keyword to optimize the search
+        search_query = f"{keyword} {GOBAL_KEYWORD}"
+
+        # Exact repeats of a query skip both the embedding and the vector search
+        cache_key = exact_cache_key(search_query)
+        exact = await asyncio.to_thread(query_exact_cache, cache_key)
+        if exact:
+            print(f"Exact cache hit for keyword '{search_query}'.")
+            return exact.get("result") or []
     
-    # Compute the embedding asynchronously (run in thread to avoid blocking)
+        # Compute the embedding asynchronously (run in thread to avoid blocking)
 
-    embedding = await asyncio.to_thread(get_embedding, search_query)
+        embedding = await asyncio.to_thread(get_embedding, search_query)
     
-    # Check the cache using the computed embedding
-    cached = await asyncio.to_thread(query_cache, embedding, 0.9)
-    if cached:
-        print(f"Cache hit for keyword '{search_query}'.")
-        return cached.get("result", [])
+        # Check the cache using the computed embedding
+        cached = await asyncio.to_thread(query_cache, embedding, 0.9)
+        if cached:
+            print(f"Cache hit for keyword '{search_query}'.")
+            result = cached.get("result", [])
+            await asyncio.to_thread(store_exact_cache, cache_key, result)
+            return result
     
-    # No cache hit—perform DuckDuckGo search
-    await asyncio.sleep(random.uniform(1, 2))
+        # No cache hit—perform DuckDuckGo search
+        await asyncio.sleep(random.uniform(1, 2))
     
-    valid_article = None
-    try:
-        with DDGS() as ddgs:
-            results = list(ddgs.text(search_query, max_results=3))
-    except Exception as e:
-        print(f"Error during DuckDuckGo search for keyword '{search_query}': {e}")
-        results = []
+        valid_article = None
+        try:
+            results = await asyncio.to_thread(ddgs_text_search, search_query, 3)
+        except Exception as e:
+            print(f"Error during DuckDuckGo search for keyword '{search_query}': {e}")
+            results = []
     
-    if results:
-        for result in results:
-            url = result.get("href") or result.get("url") or ""
-            if not url:
-                continue
-            if not url.startswith("http"):
-                url = "https://" + url
-            # Await the asynchronous URL validation
-            if await content_extractor.is_valid_url(url):
-                print(f"Valid article URL found for keyword '{search_query}': {url}")
-                title = result.get("title", "")
-                content = await content_extractor.extract_article_content(url)
-                valid_article = {
-                    "keyword": search_query,
-                    "title": title,
-                    "url": url,
-                    "content": content
-                }
-                break
-            else:
-                print(f"Invalid URL skipped: {url}")
-    else:
-        print(f"No search results for keyword '{search_query}'")
+        if results:
+            for result in results:
+                url = result.get("href") or result.get("url") or ""
+                if not url:
+                    continue
+                if not url.startswith("http"):
+                    url = "https://" + url
+                # Await the asynchronous URL validation
+                if await content_extractor.is_valid_url(url):
+                    print(f"Valid article URL found for keyword '{search_query}': {url}")
+                    title = result.get("title", "")
+                    content = await content_extractor.extract_article_content(url)
+                    valid_article = {
+                        "keyword": search_query,
+                        "title": title,
+                        "url": url,
+                        "content": content
+                    }
+                    break
+                else:
+                    print(f"Invalid URL skipped: {url}")
+        else:
+            print(f"No search results for keyword '{search_query}'")
     
-    result_to_cache = [valid_article] if valid_article else []
-    # Store the new result in cache asynchronously
-    await asyncio.to_thread(store_cache, search_query, embedding, result_to_cache)
+        result_to_cache = [valid_article] if valid_article else []
+        # Store the new result in cache asynchronously
+        await asyncio.to_thread(store_cache, search_query, embedding, result_to_cache)
+        await asyncio.to_thread(store_exact_cache, cache_key, result_to_cache)
     
-    return result_to_cache
+        return result_to_cache
 
 async def process_source_article(article_id: str, article_content: str) -> dict:
     """
     Process a source article: extract keywords and concurrently retrieve related background articles.
     """
-    print(f"\nProcessing source article ID: {article_id}")
-    try:
-        keywords = await keyword_extractor.extract_keywords(article_content)
-    except Exception as e:
-        print(f"Error extracting keywords for article {article_id}: {e}")
-        keywords = []
-    if not keywords:
-        print(f"No keywords extracted for article {article_id}")
-        return {article_id: []}
+    async with _semaphores()[0]:
+        print(f"\nProcessing source article ID: {article_id}")
+        try:
+            keywords = await keyword_extractor.extract_keywords(article_content)
+        except Exception as e:
+            print(f"Error extracting keywords for article {article_id}: {e}")
+            keywords = []
+        if not keywords:
+            print(f"No keywords extracted for article {article_id}")
+            return {article_id: []}
     
-    # Process all keywords concurrently using asyncio.gather
-    background_articles = await asyncio.gather(
-        *(search_background_articles(keyword) for keyword in keywords)
-    )
-    # Flatten the list of results
-    flattened_articles = [
-        article for sublist in background_articles for article in sublist if article
-    ]
-    return {article_id: flattened_articles}
+        # Process all keywords concurrently using asyncio.gather
+        background_articles = await asyncio.gather(
+            *(search_background_articles(keyword) for keyword in keywords)
+        )
+        # Flatten the list of results
+        flattened_articles = [
+            article for sublist in background_articles for article in sublist if article
+        ]
+        return {article_id: flattened_articles}
+
+ENRICHED_OUTPUT_FILE = "enriched_background_articles.json"
+# Results are appended here as each article finishes so a crash does not lose
+# completed work; a rerun skips the articles already recorded. The first line
+# holds a hash of the extracted_contents.json the file was built from, so a
+# leftover file from a different input is not resumed.
+ENRICHED_PARTIAL_FILE = "enriched_background_articles.jsonl"
+PARTIAL_INPUT_KEY = "input_sha256"
+
+def load_partial_results(input_hash: str) -> dict:
+    """
+    Read the per-article results already flushed to the partial JSONL file.
+    A file written for a different input (or without a header) is deleted
+    and nothing is returned.
+    """
+    results = {}
+    if not os.path.exists(ENRICHED_PARTIAL_FILE):
+        return results
+    with open(ENRICHED_PARTIAL_FILE, "rb") as f:
+        try:
+            header = orjson.loads(f.readline())
+        except orjson.JSONDecodeError:
+            header = None
+        if isinstance(header, dict) and header.get(PARTIAL_INPUT_KEY) == input_hash:
+            for line in f:
+                try:
+                    results.update(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    # A crash can leave a truncated last line; that article is redone.
+                    continue
+            return results
+    print(f"Discarding {ENRICHED_PARTIAL_FILE}: it was written for a different input")
+    os.remove(ENRICHED_PARTIAL_FILE)
+    return results
 
 async def process_all_source_articles():
     """
     Process all source articles from extracted_contents.json and save enriched background articles.
     """
-    with open("extracted_contents.json", "r", encoding="utf-8") as f:
-        source_articles = json.load(f)
+    with open("extracted_contents.json", "rb") as f:
+        raw = f.read()
+    input_hash = hashlib.sha256(raw).hexdigest()
+    source_articles = orjson.loads(raw)
+    del raw
 
-    articles_dict = {}
     if isinstance(source_articles, list):
-        for art in source_articles:
-            art_id = str(art.get("id", "unknown"))
-            content = art.get("headline", "") if isinstance(art, dict) and "headline" in art else str(art)
-            articles_dict[art_id] = content
+        pending = [
+            (
+                str(art.get("id", "unknown")) if isinstance(art, dict) else "unknown",
+                art.get("headline", "") if isinstance(art, dict) and "headline" in art else str(art)
+            )
+            for art in source_articles
+        ]
     else:
-        articles_dict = source_articles
+        pending = list(source_articles.items())
+    input_ids = {art_id for art_id, _ in pending}
 
-    # Process all articles concurrently
-    results = await asyncio.gather(
-        *(process_source_article(art_id, content)
-          for art_id, content in articles_dict.items())
-    )
-    
-    # Combine all results into one dictionary
-    enriched_background = {}
-    for result in results:
-        enriched_background.update(result)
-    
-    with open("enriched_background_articles.json", "w", encoding="utf-8") as f:
-        json.dump(enriched_background, f, indent=2, ensure_ascii=False)
+    done_ids = load_partial_results(input_hash).keys() & input_ids
+    if done_ids:
+        print(f"Resuming: {len(done_ids)} articles already enriched in {ENRICHED_PARTIAL_FILE}")
+    tasks = [
+        process_source_article(art_id, content)
+        for art_id, content in pending
+        if art_id not in done_ids
+    ]
+    del source_articles, pending
+
+    # Flush each article to disk as soon as it completes
+    with open(ENRICHED_PARTIAL_FILE, "ab") as out:
+        if out.tell():
+            # Terminate a line a previous run may have left truncated
+            out.write(b"\n")
+        else:
+            out.write(orjson.dumps({PARTIAL_INPUT_KEY: input_hash}) + b"\n")
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            out.write(orjson.dumps(result) + b"\n")
+            out.flush()
+
+    # Downstream steps read a single JSON object keyed by article id
+    enriched_background = {
+        art_id: articles
+        for art_id, articles in load_partial_results(input_hash).items()
+        if art_id in input_ids
+    }
+    with open(ENRICHED_OUTPUT_FILE, "wb") as f:
+        f.write(orjson.dumps(enriched_background, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    os.remove(ENRICHED_PARTIAL_FILE)
     print("Enriched background articles generation complete.")
 
 if __name__ == '__main__':
@@ -3,21 +3,25 @@ Review package for handling article review operations.
 This package contains modules for reviewing, cleaning, and updating articles.
 """
 
-from .article_review import review_article_fields, main
+from .article_review import review_article_fields, main, main_async
 from .similarity import check_similarity_and_update, cosine_similarity
-from .text_utils import clean_text
-from .image_utils import verify_image_accessibility
-from .db_utils import update_article, delete_article_and_update_news_result
+from createArticles.text_utils import clean_text
+from .image_utils import verify_image_accessibility, verify_image_accessibility_async
+from .db_utils import update_article, update_articles, mark_articles_reviewed, delete_article_and_update_news_result
 from .model_utils import generate_text_with_model
 
 __all__ = [
     'review_article_fields',
     'main',
+    'main_async',
     'check_similarity_and_update',
     'cosine_similarity',
     'clean_text',
     'verify_image_accessibility',
+    'verify_image_accessibility_async',
     'update_article',
+    'update_articles',
+    'mark_articles_reviewed',
     'delete_article_and_update_news_result',
     'generate_text_with_model'
 ]
\ No newline at end of file
@@ -4,55 +4,51 @@ Main article review functionality for processing and reviewing articles.
 
 import os
 import sys
+import asyncio
+import traceback
 from dotenv import load_dotenv
 
 # Add parent directory to Python path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from supabase_init import SupabaseClient
-from .text_utils import clean_text
-from .image_utils import verify_image_accessibility
-from .db_utils import update_article, delete_article_and_update_news_result
+from .client import get_supabase
+from createArticles.text_utils import clean_text
+from .image_utils import verify_image_accessibility_async
+from .db_utils import update_article, update_articles, mark_articles_reviewed, delete_article_and_update_news_result
 from createArticles.getImage import search_image  # Fixed import path
 
-async def review_article_fields(record_id: int, news_result_unique_name: str) -> bool:
+async def review_article_fields(record_id: int, news_result_unique_name: str, supabase=None) -> bool:
     """
     Review article fields and handle invalid articles.
     Returns True if article passes review, False if it fails and is deleted.
     
     Now includes fallback image selection if the primary image is not accessible.
+    Pass `supabase` to reuse an existing SupabaseClient across calls.
     """
-    supabase = SupabaseClient()
+    if supabase is None:
+        supabase = get_supabase()
     print(f"=== REVIEW: Starting review for article {record_id} with news result {news_result_unique_name} ===")
-    
-    # Get the article record
-    response = supabase.client.table("NewsArticle").select("*").eq("id", record_id).execute()
-    if not response.data or len(response.data) == 0:
-        print(f"No article found with ID {record_id}")
-        return False
-    
-    article = response.data[0]
-    
-    # Check required fields
-    required_fields = {
-        "EnglishArticle": article.get("EnglishArticle", ""),
-        "GermanArticle": article.get("GermanArticle", ""),
-        "EnglishHeadline": article.get("EnglishHeadline", ""),
-        "GermanHeadline": article.get("GermanHeadline", "")
-    }
-    
-    # Check if any required field is empty
-    if any(not field.strip() for field in required_fields.values()):
-        print(f"Article {record_id} failed review - missing required content")
-        await delete_article_and_update_news_result(supabase, record_id, news_result_unique_name)
+
+    # Load the article and check its required fields in a single round-trip.
+    # The review_article RPC deletes the article and resets its NewsResults
+    # entry itself when any required field is empty, and returns NULL.
+    response = await asyncio.to_thread(
+        lambda: supabase.client.rpc(
+            "review_article",
+            {"p_id": record_id, "p_uniq": news_result_unique_name}
+        ).execute()
+    )
+    article = response.data
+    if not article:
+        print(f"Article {record_id} failed review - not found or missing required content")
         return False
-    
+
     # Check image accessibility
     image_url = article.get("imageUrl", "")
     print(f"\nREVIEW: Checking image accessibility for article {record_id}")
     print(f"REVIEW: Image URL: {image_url}")
     
-    if not verify_image_accessibility(image_url):
+    if not await verify_image_accessibility_async(image_url):
         print(f"REVIEW: Primary image is not accessible: {image_url}. Attempting to find backup images...")
         
         # Try to find backup images using the article content and keywords
@@ -77,20 +73,26 @@ async def review_article_fields(record_id: int, news_result_unique_name: str) ->
                 
             print(f"REVIEW: Found {len(backup_images)} backup image candidates")
                 
-            # Try each backup image until we find one that's accessible
+            # Start checking all backup images at once, then take results in
+            # candidate order: the first accessible one wins as soon as every
+            # candidate before it has failed, and the remaining checks are dropped
+            candidates = [img_data for img_data in backup_images if img_data.get("image")]
+            checks = [
+                asyncio.create_task(verify_image_accessibility_async(img_data["image"]))
+                for img_data in candidates
+            ]
             accessible_image = None
-            for i, img_data in enumerate(backup_images):
-                backup_img_url = img_data.get("image")
-                if not backup_img_url:
-                    continue
-                    
-                print(f"REVIEW: Checking backup image {i+1}: {backup_img_url}")
-                if verify_image_accessibility(backup_img_url):
-                    print(f"REVIEW: Found accessible backup image: {backup_img_url}")
-                    accessible_image = img_data
-                    break
-                else:
-                    print(f"REVIEW: Backup image {i+1} is not accessible")
+            try:
+                for i, (img_data, check) in enumerate(zip(candidates, checks)):
+                    if await check:
+                        print(f"REVIEW: Found accessible backup image: {img_data['image']}")
+                        accessible_image = img_data
+                        break
+                    else:
+                        print(f"REVIEW: Backup image {i+1} is not accessible")
+            finally:
+                for check in checks:
+                    check.cancel()
             
             # If we found an accessible backup image, update the article
             if accessible_image:
@@ -118,7 +120,6 @@ async def review_article_fields(record_id: int, news_result_unique_name: str) ->
             
         except Exception as e:
             print(f"REVIEW: Error while searching for backup images: {e}")
-            import traceback
             print(f"REVIEW: Exception traceback: {traceback.format_exc()}")
             await delete_article_and_update_news_result(supabase, record_id, news_result_unique_name)
             return False
@@ -128,65 +129,128 @@ async def review_article_fields(record_id: int, news_result_unique_name: str) ->
     print(f"=== REVIEW: Article {record_id} successfully passed review ===")
     return True
 
-def main():
-    load_dotenv()
-    
-    # Initialize Supabase client
-    supabase_client = SupabaseClient()
-    
-    try:
-        # Fetch only unreviewed articles
-        response = supabase_client.client.table('NewsArticle')\
+# Rows fetched per page when scanning for unreviewed articles
+REVIEW_PAGE_SIZE = 1000
+
+def iter_unreviewed(supabase_client, chunk: int = REVIEW_PAGE_SIZE):
+    """
+    Yield unreviewed articles one page at a time so only `chunk` rows are
+    held in memory. Pages are keyed on id rather than an offset: reviewed
+    rows drop out of the filter, so an offset would skip over rows that
+    have not been seen yet.
+    """
+    last_id = None
+    while True:
+        query = supabase_client.client.table('NewsArticle')\
             .select('id', 'EnglishHeadline', 'GermanHeadline', 'EnglishArticle', 'GermanArticle')\
             .eq('isReviewed', False)\
-            .execute()
+            .order('id')\
+            .limit(chunk)
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        rows = query.execute().data
         
-        if not response.data:
-            print("No unreviewed articles found.")
+        if not rows:
             return
-            
-        print(f"Found {len(response.data)} unreviewed articles to process.")
         
-        # Process each article
-        for article in response.data:
-            article_id = article['id']
-            fields = {
-                'EnglishHeadline': article.get('EnglishHeadline', ''),
-                'GermanHeadline': article.get('GermanHeadline', ''),
-                'EnglishArticle': article.get('EnglishArticle', ''),
-                'GermanArticle': article.get('GermanArticle', '')
-            }
-            
-            # Clean all fields
-            cleaned_fields = {
-                key: clean_text(value) for key, value in fields.items()
-            }
+        last_id = rows[-1]['id']
+        yield rows
+
+# Page writes (one per group of changed fields) in flight at once
+REVIEW_WRITE_CONCURRENCY = 10
+
+async def main_async():
+    load_dotenv()
+    
+    # Initialize Supabase client
+    supabase_client = get_supabase()
+    write_sem = asyncio.Semaphore(REVIEW_WRITE_CONCURRENCY)
+    
+    async def write(keys, rows):
+        """Write a group of rows that all set the same columns (`keys`)."""
+        async with write_sem:
+            if keys == ('isReviewed',):
+                # Nothing was cleaned: flag the ids with one UPDATE ... IN
+                ids = [row['id'] for row in rows]
+                written = await asyncio.to_thread(mark_articles_reviewed, supabase_client, ids)
+            else:
+                written = await asyncio.to_thread(update_articles, supabase_client, rows)
+            if written:
+                print(f"Marked {len(rows)} articles as reviewed")
+                return
             
-            # Check if any changes were made
-            needs_update = any(cleaned_fields[key] != fields[key] for key in fields)
+            # Fall back to one update per article, so a single bad row does
+            # not leave the whole group unreviewed
+            print(f"Retrying {len(rows)} articles one at a time")
+            updated = 0
+            for row in rows:
+                if await update_article(supabase_client, row['id'], {key: row[key] for key in keys}):
+                    updated += 1
+            print(f"Marked {updated} articles as reviewed")
+    
+    try:
+        total = 0
+        pages = iter_unreviewed(supabase_client)
+        pending_writes = None
+        while True:
+            # Fetch off the event loop
+            page = await asyncio.to_thread(next, pages, None)
+            if page is None:
+                break
+            print(f"Found {len(page)} unreviewed articles to process.")
+            total += len(page)
             
-            if needs_update:
-                print(f"Cleaning article {article_id}...")
-                # Add isReviewed flag to the update
-                cleaned_fields['isReviewed'] = True
-                if update_article(supabase_client, article_id, cleaned_fields):
-                    print(f"Successfully cleaned and updated article {article_id}")
+            # Clean each article and collect only the changed fields, grouped
+            # by which fields changed. Articles that need no cleaning only
+            # have isReviewed flipped.
+            batches = {}
+            for article in page:
+                article_id = article['id']
+                fields = {
+                    'EnglishHeadline': article.get('EnglishHeadline', ''),
+                    'GermanHeadline': article.get('GermanHeadline', ''),
+                    'EnglishArticle': article.get('EnglishArticle', ''),
+                    'GermanArticle': article.get('GermanArticle', '')
+                }
+                
+                # Clean all fields and keep the ones that changed
+                delta = {}
+                for key, value in fields.items():
+                    cleaned = clean_text(value)
+                    if cleaned != value:
+                        delta[key] = cleaned
+                
+                if delta:
+                    print(f"Cleaning article {article_id}...")
                     # Print which fields were cleaned
-                    for key in fields:
-                        if cleaned_fields[key] != fields[key]:
-                            print(f"  - Cleaned {key}")
+                    for key in delta:
+                        print(f"  - Cleaned {key}")
                 else:
-                    print(f"Failed to update article {article_id}")
-            else:
-                print(f"No cleaning needed for article {article_id}")
+                    print(f"No cleaning needed for article {article_id}")
+                
                 # Mark as reviewed even if no cleaning was needed
-                if update_article(supabase_client, article_id, {'isReviewed': True}):
-                    print(f"Article {article_id} marked as reviewed")
-                else:
-                    print(f"Failed to mark article {article_id} as reviewed")
+                delta['isReviewed'] = True
+                batches.setdefault(tuple(delta), []).append({'id': article_id, **delta})
+            
+            # One write per group of changed fields instead of one UPDATE per
+            # article, all sent concurrently. They run in the background while
+            # the next page is fetched and cleaned; at most two pages are held.
+            if pending_writes is not None:
+                await pending_writes
+            pending_writes = asyncio.gather(*(write(keys, rows) for keys, rows in batches.items()))
+        
+        if pending_writes is not None:
+            await pending_writes
+        
+        if total == 0:
+            print("No unreviewed articles found.")
                 
     except Exception as e:
         print(f"Error processing articles: {e}")
 
+def main():
+    """Synchronous entry point: run the review pass to completion."""
+    asyncio.run(main_async())
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
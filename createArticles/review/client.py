@@ -0,0 +1,21 @@
+"""
+Shared Supabase client for the review package.
+"""
+
+import os
+import sys
+import functools
+
+# Add parent directory to Python path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from supabase_init import SupabaseClient
+
+@functools.lru_cache(maxsize=1)
+def get_supabase() -> SupabaseClient:
+    """
+    Return the process-wide SupabaseClient, creating it on first use.
+    Building one sets up a new HTTP client and loads the team detector, so
+    every review shares this instance and its connection pool.
+    """
+    return SupabaseClient()
@@ -2,28 +2,62 @@
 Database utility functions for interacting with the Supabase database.
 """
 
+import asyncio
+
 async def update_article(supabase_client, article_id: int, updates: dict) -> bool:
     """Update the article with provided updates."""
     try:
-        response = supabase_client.client.table('NewsArticle').update(updates)\
-            .eq('id', article_id).execute()
+        response = await asyncio.to_thread(
+            lambda: supabase_client.client.table('NewsArticle').update(updates)
+                .eq('id', article_id).execute()
+        )
         
         return len(response.data) > 0
     except Exception as e:
         print(f"Error updating article {article_id}: {e}")
         return False
 
+def update_articles(supabase_client, rows: list) -> bool:
+    """
+    Write several article updates in one request through the update_articles
+    RPC. Every row needs an 'id'; only the keys a row has are written, and
+    ids that no longer exist are skipped instead of being inserted.
+    """
+    if not rows:
+        return True
+    try:
+        supabase_client.client.rpc('update_articles', {'p_rows': rows}).execute()
+        return True
+    except Exception as e:
+        print(f"Error updating articles {rows[0]['id']}-{rows[-1]['id']}: {e}")
+        return False
+
+def mark_articles_reviewed(supabase_client, article_ids: list) -> bool:
+    """Set isReviewed on all given articles with a single UPDATE ... WHERE id IN (...)."""
+    if not article_ids:
+        return True
+    try:
+        supabase_client.client.table('NewsArticle')\
+            .update({'isReviewed': True})\
+            .in_('id', article_ids)\
+            .execute()
+        return True
+    except Exception as e:
+        print(f"Error marking articles {article_ids[0]}-{article_ids[-1]} as reviewed: {e}")
+        return False
+
 async def delete_article_and_update_news_result(supabase, record_id: int, news_result_unique_name: str):
     """Helper function to delete article and update NewsResults"""
     try:
-        # Delete the article
-        supabase.client.table("NewsArticle").delete().eq("id", record_id).execute()
+        # Delete the article and set NewsResults isProcessed to false in one
+        # transaction, off the event loop
+        await asyncio.to_thread(
+            lambda: supabase.client.rpc("cleanup_invalid_article", {
+                "p_id": record_id,
+                "p_unique_name": news_result_unique_name
+            }).execute()
+        )
         print(f"Deleted article {record_id} from NewsArticle table")
-        
-        # Update NewsResults isProcessed to false
-        supabase.client.table("NewsResults").update(
-            {"isProcessed": False}
-        ).eq("uniqueName", news_result_unique_name).execute()
         print(f"Updated NewsResults record {news_result_unique_name} to isProcessed=false")
     except Exception as e:
-        print(f"Error during cleanup of invalid article: {e}")
\ No newline at end of file
+        print(f"Error during cleanup of invalid article: {e}")
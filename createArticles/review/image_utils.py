@@ -3,8 +3,263 @@ Utility functions for verifying and handling images.
 """
 
 import os
+import asyncio
+import contextlib
+import logging
+import threading
+import time
+import weakref
 import requests
 import urllib.parse
+from concurrent.futures import Future, ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+_REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8'
+}
+
+class _TTLCache:
+    """
+    Small thread-safe mapping whose entries expire `ttl` seconds after they
+    are stored. When full, the oldest entry is dropped. get() returns None
+    for missing or expired keys.
+    """
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+    
+    def set(self, key, value, ttl: float = None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data.pop(key, None)
+            if len(self._data) >= self.maxsize:
+                del self._data[next(iter(self._data))]
+            self._data[key] = (expires, value)
+
+# Shared session so repeated checks against the same image hosts reuse
+# kept-alive connections instead of a new DNS lookup and TCP+TLS handshake
+# per URL
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    # Failed connects are retried twice and a transient gateway error once;
+    # a read timeout is not retried. With _REQUEST_TIMEOUT below a request
+    # takes at most about 14s (vs. the single 15s timeout this replaced).
+    # A 5xx that persists is returned and counts as inaccessible.
+    max_retries=Retry(
+        total=2,
+        connect=2,
+        read=0,
+        status=1,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        raise_on_status=False
+    )
+)
+_SESSION.mount('https://', _ADAPTER)
+_SESSION.mount('http://', _ADAPTER)
+_SESSION.headers.update(_REQUEST_HEADERS)
+
+# (connect, read) timeouts in seconds; an image host that takes longer than
+# this to answer a HEAD is not worth waiting on
+_REQUEST_TIMEOUT = (2, 7)
+
+# Servers that reject HEAD (forbidden, method not allowed, not implemented)
+# are retried with a one-byte ranged GET
+_HEAD_FALLBACK_STATUSES = frozenset({403, 405, 501})
+
+# Generic binary types some CDNs serve images with
+_BINARY_CONTENT_TYPES = frozenset({'application/octet-stream', 'binary/octet-stream'})
+# Accepted when the content type is not conclusive
+_IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.svg'})
+
+# RFC 3986 reserved characters plus '%', left alone when encoding image URLs
+_URL_SAFE_CHARS = ":/?#[]@!$&'()*+,;=%"
+# Every byte quote() leaves untouched; a URL made only of these needs no encoding
+_URL_UNQUOTED_BYTES = (
+    b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_.-~'
+    + _URL_SAFE_CHARS.encode('ascii')
+)
+
+# Image CDNs whose URLs are accepted on extension alone, without a request.
+# Comma-separated host names, e.g. "cdn.example.com,images.example.com";
+# empty by default so every image is checked over the network.
+_TRUSTED_IMAGE_HOSTS = frozenset(
+    host.strip().lower()
+    for host in os.getenv("REVIEW_TRUSTED_IMAGE_HOSTS", "").split(",")
+    if host.strip()
+)
+
+# Results of image checks per encoded URL. Backup searches and team photos
+# keep returning the same images, so a working image is trusted for an hour;
+# a broken one can come back and is re-checked after ten minutes.
+_IMAGE_CHECK_CACHE = _TTLCache(maxsize=4096, ttl=3600)
+_IMAGE_FAILURE_TTL = 600
+
+# Hosts that keep failing (timeouts, connection errors) are skipped for a
+# while instead of costing a full timeout for every image they serve
+_HOST_FAILURE_LIMIT = 3
+_HOST_FAILURE_WINDOW = 60
+_HOST_BAN_SECONDS = 300
+_HOST_FAILURES = {}
+_HOST_BANNED_UNTIL = {}
+_HOST_LOCK = threading.Lock()
+
+def _host_banned(host: str) -> bool:
+    with _HOST_LOCK:
+        return time.monotonic() < _HOST_BANNED_UNTIL.get(host, 0)
+
+def _record_host_failure(host: str):
+    """Count a failed request to host and ban it once it fails too often."""
+    now = time.monotonic()
+    with _HOST_LOCK:
+        failures = [t for t in _HOST_FAILURES.get(host, ()) if now - t < _HOST_FAILURE_WINDOW]
+        failures.append(now)
+        if len(failures) >= _HOST_FAILURE_LIMIT:
+            _HOST_BANNED_UNTIL[host] = now + _HOST_BAN_SECONDS
+            failures = []
+            logger.warning("Image host %s failed %s times in %ss, skipping it for %ss",
+                           host, _HOST_FAILURE_LIMIT, _HOST_FAILURE_WINDOW, _HOST_BAN_SECONDS)
+        _HOST_FAILURES[host] = failures
+
+def _record_host_success(host: str):
+    with _HOST_LOCK:
+        _HOST_FAILURES.pop(host, None)
+
+# Upper bound on image checks in flight at once, matching the session pool size.
+# One semaphore per event loop, since the module can outlive a loop when
+# several asyncio.run() stages share an interpreter.
+_IMAGE_CHECK_LIMIT = 32
+_IMAGE_CHECK_SEMAPHORES = weakref.WeakKeyDictionary()
+# Checks run on their own threads: asyncio's default executor can be as small
+# as five workers and is shared with every other to_thread call
+_IMAGE_CHECK_POOL = ThreadPoolExecutor(max_workers=_IMAGE_CHECK_LIMIT, thread_name_prefix='image-check')
+# At most this many checks against any single host at once, so a page of
+# images from one CDN does not hammer it
+_PER_HOST_LIMIT = 8
+_HOST_SEMAPHORES = {}
+
+# Checks currently running, per encoded URL
+_INFLIGHT = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+def _host_semaphore(host: str) -> threading.BoundedSemaphore:
+    with _HOST_LOCK:
+        semaphore = _HOST_SEMAPHORES.get(host)
+        if semaphore is None:
+            semaphore = _HOST_SEMAPHORES[host] = threading.BoundedSemaphore(_PER_HOST_LIMIT)
+        return semaphore
+
+def _image_check_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _IMAGE_CHECK_SEMAPHORES.get(loop)
+    if semaphore is None:
+        semaphore = _IMAGE_CHECK_SEMAPHORES[loop] = asyncio.Semaphore(_IMAGE_CHECK_LIMIT)
+    return semaphore
+
+def _check_image(encoded_url: str) -> bool:
+    """
+    Network part of verify_image_accessibility. Request errors propagate to
+    the caller, so only definite answers end up in _IMAGE_CHECK_CACHE.
+    """
+    logger.debug("Checking image URL: %s", encoded_url)
+    
+    # Only status and headers are needed, so ask for nothing else. Each
+    # response is closed on the spot so its connection goes back to the pool.
+    with _SESSION.head(
+        encoded_url,
+        timeout=_REQUEST_TIMEOUT,
+        allow_redirects=True
+    ) as response:
+        status_code, headers = response.status_code, response.headers
+    
+    # Some servers reject HEAD or answer it without a content type
+    if (status_code in _HEAD_FALLBACK_STATUSES
+            or (200 <= status_code < 300 and 'content-type' not in headers)):
+        logger.debug("HEAD returned %s, retrying with ranged GET: %s", status_code, encoded_url)
+        with _SESSION.get(
+            encoded_url,
+            timeout=_REQUEST_TIMEOUT,
+            allow_redirects=True,
+            headers={'Range': 'bytes=0-0'},
+            stream=True
+        ) as response:
+            status_code, headers = response.status_code, response.headers
+    
+    logger.debug("Response status: %s", status_code)
+    
+    # Check status code first (accept 200-299 range)
+    if not (200 <= status_code < 300):
+        logger.info("Image URL returned status code %s: %s", status_code, encoded_url)
+        return False
+        
+    # Check content type
+    content_type = headers.get('content-type', '').lower()
+    content_length = headers.get('content-length')
+    
+    logger.debug("Content type: %s, content length: %s", content_type, content_length)
+    
+    # More permissive content type checking
+    mime_type = content_type.split(';', 1)[0].strip()
+    
+    if not (mime_type.startswith('image') or mime_type in _BINARY_CONTENT_TYPES):
+        # If content type check fails, try to check file extension
+        file_ext = os.path.splitext(urllib.parse.urlparse(encoded_url).path)[1].lower()
+        
+        if file_ext not in _IMAGE_EXTENSIONS:
+            logger.info("URL does not appear to be an image (content-type: %s, extension: %s): %s",
+                        content_type, file_ext, encoded_url)
+            return False
+    
+    # Consider it valid if we got this far
+    return True
+
+def _check_image_once(encoded_url: str, host: str) -> bool:
+    """
+    Run _check_image unless another thread is already checking the same URL,
+    in which case wait for its answer (or exception) instead of sending a
+    second request. The thread that makes the request records the result in
+    _IMAGE_CHECK_CACHE and the outcome against the host.
+    """
+    with _INFLIGHT_LOCK:
+        future = _INFLIGHT.get(encoded_url)
+        owner = future is None
+        if owner:
+            future = _INFLIGHT[encoded_url] = Future()
+    if not owner:
+        return future.result()
+    
+    try:
+        with _host_semaphore(host) if host else contextlib.nullcontext():
+            accessible = _check_image(encoded_url)
+        _IMAGE_CHECK_CACHE.set(encoded_url, accessible, ttl=None if accessible else _IMAGE_FAILURE_TTL)
+        if host:
+            _record_host_success(host)
+        future.set_result(accessible)
+        return accessible
+    except BaseException as e:
+        if host and isinstance(e, requests.RequestException):
+            _record_host_failure(host)
+        future.set_exception(e)
+        raise
+    finally:
+        with _INFLIGHT_LOCK:
+            del _INFLIGHT[encoded_url]
 
 def verify_image_accessibility(image_url: str) -> bool:
     """
@@ -13,7 +268,7 @@ def verify_image_accessibility(image_url: str) -> bool:
     """
     try:
         if not image_url or not image_url.strip():
-            print("Empty image URL")
+            logger.info("Empty image URL")
             return False
         
         # Clean the URL
@@ -23,66 +278,55 @@ def verify_image_accessibility(image_url: str) -> bool:
         if image_url.startswith('//'):
             image_url = 'https:' + image_url
             
-        # Ensure URL is properly encoded
         parsed = urllib.parse.urlparse(image_url)
-        encoded_url = urllib.parse.urlunparse(
-            parsed._replace(
-                path=urllib.parse.quote(parsed.path),
-                query=urllib.parse.quote(parsed.query, safe='=&')
-            )
-        )
-        
-        print(f"Checking image URL: {encoded_url}")
         
-        # Make request with extended timeout and allow redirects
-        response = requests.get(
-            encoded_url,
-            timeout=15,
-            allow_redirects=True,
-            headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8'
-            },
-            stream=True  # Don't download the whole image, just headers
-        )
-        
-        # Print response details for debugging
-        print(f"Response status: {response.status_code}")
-        print(f"Response headers: {dict(response.headers)}")
-        
-        # Check status code first (accept 200-299 range)
-        if not (200 <= response.status_code < 300):
-            print(f"Image URL returned status code {response.status_code}: {encoded_url}")
+        # Only http(s) images can be served to readers; data: URIs, other
+        # schemes and scheme-less strings are rejected without a request
+        if parsed.scheme not in ('http', 'https') or not parsed.netloc:
+            logger.info("Not an http(s) image URL: %.100s", image_url)
             return False
-            
-        # Check content type
-        content_type = response.headers.get('content-type', '').lower()
-        content_length = response.headers.get('content-length')
         
-        print(f"Content type: {content_type}")
-        print(f"Content length: {content_length}")
+        # Known CDN serving a file with an image extension: skip the request
+        if (parsed.hostname in _TRUSTED_IMAGE_HOSTS
+                and os.path.splitext(parsed.path)[1].lower() in _IMAGE_EXTENSIONS):
+            logger.debug("Trusted image host, skipping check: %s", image_url)
+            return True
         
-        # More permissive content type checking
-        valid_content_types = ['image', 'application/octet-stream', 'binary/octet-stream']
+        # Ensure URL is properly encoded. Only characters that cannot appear
+        # in a URL are quoted; reserved characters and existing %XX escapes are
+        # kept, since quoting them again turns %20 into %2520 and breaks the URL.
+        # Most URLs are already clean ASCII and come back from quote() unchanged,
+        # so only call it when some byte would actually be escaped.
+        if image_url.isascii() and not image_url.encode('ascii').translate(None, _URL_UNQUOTED_BYTES):
+            encoded_url = image_url
+        else:
+            encoded_url = urllib.parse.quote(image_url, safe=_URL_SAFE_CHARS)
         
-        if not any(t in content_type for t in valid_content_types):
-            # If content type check fails, try to check file extension
-            file_ext = os.path.splitext(parsed.path)[1].lower()
-            valid_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.svg']
-            
-            if file_ext not in valid_extensions:
-                print(f"URL does not appear to be an image (content-type: {content_type}, extension: {file_ext}): {encoded_url}")
+        # Encoded form as the key, so differently escaped copies of a URL share an entry
+        accessible = _IMAGE_CHECK_CACHE.get(encoded_url)
+        if accessible is None:
+            host = parsed.hostname
+            if host and _host_banned(host):
+                logger.info("Image host %s is failing, skipping: %s", host, image_url)
                 return False
-        
-        # Consider it valid if we got this far
-        return True
+            accessible = _check_image_once(encoded_url, host)
+        return accessible
         
     except requests.Timeout:
-        print(f"Timeout while accessing image URL: {image_url}")
+        logger.info("Timeout while accessing image URL: %s", image_url)
         return False
     except requests.RequestException as e:
-        print(f"Error accessing image URL {image_url}: {str(e)}")
+        logger.info("Error accessing image URL %s: %s", image_url, e)
         return False
     except Exception as e:
-        print(f"Unexpected error checking image URL {image_url}: {str(e)}")
-        return False
\ No newline at end of file
+        logger.info("Unexpected error checking image URL %s: %s", image_url, e)
+        return False
+
+async def verify_image_accessibility_async(image_url: str) -> bool:
+    """
+    Run verify_image_accessibility in a worker thread so several checks can
+    overlap without blocking the event loop.
+    """
+    async with _image_check_semaphore():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_IMAGE_CHECK_POOL, verify_image_accessibility, image_url)
\ No newline at end of file
@@ -2,6 +2,14 @@
 Utility functions for interacting with language models.
 """
 
+import functools
+
+@functools.lru_cache(maxsize=4)
+def _openai_client(api_key: str):
+    """One OpenAI client per API key, so every prompt reuses its connection pool."""
+    from openai import OpenAI
+    return OpenAI(api_key=api_key)
+
 def generate_text_with_model(model_dict, prompt):
     """
     Generate text using the model returned by initialize_model().
@@ -10,8 +18,7 @@ def generate_text_with_model(model_dict, prompt):
     try:
         provider = model_dict.get("provider", "").lower()
         if provider == "openai":
-            from openai import OpenAI
-            openai_client = OpenAI(api_key=model_dict.get("model", {}).get("api_key"))
+            openai_client = _openai_client(model_dict.get("model", {}).get("api_key"))
             response = openai_client.chat.completions.create(
                 model=model_dict.get("model_name", "gpt-4o-mini"),
                 messages=[{"role": "user", "content": prompt}]
@@ -4,17 +4,46 @@ Functions for checking similarity between articles and handling similar content.
 
 import sys
 import os
+import asyncio
+import logging
 import numpy as np
+import orjson
 import datetime
 import traceback
 
 # Add parent directory to Python path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from supabase_init import SupabaseClient
 from LLMSetup import initialize_model
 from .model_utils import generate_text_with_model
 from .db_utils import update_article
+from .client import get_supabase
+from createArticles.embedding_utils import similarity_rows, is_same_article
+
+logger = logging.getLogger(__name__)
+
+# NewsResults columns the similarity check reads; the full rows carry the
+# article text and are many times larger
+SIMILARITY_COLUMNS = "id,uniqueName,url,embedding"
+# NewsArticle columns the merge step reads from the article it updates
+MERGE_ARTICLE_COLUMNS = "id,NewsResult,sourceURL,Status,EnglishHeadline,EnglishArticle,GermanArticle"
+
+# Set SIMILARITY_USE_PGVECTOR=true to let the database find similar articles
+# (find_similar_pairs RPC) instead of downloading every processed embedding
+USE_PGVECTOR = os.getenv("SIMILARITY_USE_PGVECTOR", "").lower() == "true"
+# Most similar processed articles returned per unprocessed article by the RPC
+SIMILARITY_MATCH_COUNT = 10
+
+# Unprocessed articles scored per matrix product; bounds the similarity
+# matrix to SIMILARITY_TILE_ROWS x processed articles at a time
+SIMILARITY_TILE_ROWS = 512
+
+# Ids or names per .in_() filter when loading merge targets; the filter goes
+# into the GET URL, which has a length limit
+MERGE_TARGET_CHUNK = 200
+
+# Merges (two LLM calls each) running at once, to stay clear of rate limits
+SIMILARITY_MERGE_CONCURRENCY = 8
 
 def cosine_similarity(embedding1, embedding2):
     """
@@ -26,20 +55,123 @@ def cosine_similarity(embedding1, embedding2):
         
     Returns:
         Cosine similarity score between 0 and 1
+    
+    Single-pair helper kept for callers of the package API; to compare many
+    embeddings, stack them with embedding_utils.unit_rows and take one matrix product.
     """
-    # Convert to numpy arrays if they aren't already
-    vec1 = np.array(embedding1)
-    vec2 = np.array(embedding2)
+    # float32 like the batch path: half the bytes of float64, same ranking
+    vec1 = np.asarray(embedding1, dtype=np.float32)
+    vec2 = np.asarray(embedding2, dtype=np.float32)
+    
+    # |a| * |b| as one square root of the product of squared norms
+    norms_squared = vec1 @ vec1 * (vec2 @ vec2)
+    if norms_squared == 0:
+        return 0.0  # Handle zero vectors
     
-    # Calculate cosine similarity
-    dot_product = np.dot(vec1, vec2)
-    norm_1 = np.linalg.norm(vec1)
-    norm_2 = np.linalg.norm(vec2)
+    return float(vec1 @ vec2 / np.sqrt(norms_squared))
+
+def _decode_embeddings(articles):
+    """
+    Decode embeddings that arrive as text in place. PostgREST returns pgvector
+    columns as strings like "[0.1,0.2,...]"; orjson parses those several
+    times faster than the json module. Rows whose embedding cannot be parsed
+    are treated as having none.
+    """
+    for article in articles:
+        embedding = article.get("embedding")
+        if isinstance(embedding, str):
+            try:
+                article["embedding"] = orjson.loads(embedding)
+            except orjson.JSONDecodeError as e:
+                print(f"Invalid embedding for article {article.get('id')}: {e}")
+                article["embedding"] = None
+
+def _similar_from_scores(processed_articles, processed_indices, scores):
+    """
+    Turn one row of similarity_rows into the list of similar processed
+    articles, most similar first.
+    """
+    # Visit hits from highest similarity down
+    return [
+        {
+            "article": processed_articles[processed_indices[j]],
+            "similarity": float(scores[j])
+        }
+        for j in np.argsort(-scores, kind="stable")
+    ]
+
+def _find_similar_in_database(supabase, unprocessed_articles, threshold):
+    """
+    pgvector counterpart of similarity_rows: the find_similar_pairs RPC
+    returns the closest processed NewsResults at or above the threshold for
+    every unprocessed article in one call, using the HNSW index on
+    NewsResults.embedding.
+    
+    Returns:
+        Dict mapping an unprocessed NewsResults id to its similar processed
+        articles, most similar first. Articles without a match are left out.
+    """
+    try:
+        response = supabase.client.rpc("find_similar_pairs", {
+            "match_threshold": threshold,
+            "match_count": SIMILARITY_MATCH_COUNT
+        }).execute()
+    except Exception as e:
+        print(f"Error calculating similarity: {e}")
+        return {}
+    
+    unprocessed_by_id = {article.get("id"): article for article in unprocessed_articles}
+    similar_by_id = {}
+    for row in response.data or []:
+        unprocessed = unprocessed_by_id.get(row.pop("unprocessed_id"))
+        if unprocessed is None:
+            continue
+        similarity = row.pop("similarity")
+        if is_same_article(unprocessed, row):
+            print(f"Skipping self-comparison for article {row.get('id')}")
+            continue
+        similar_by_id.setdefault(unprocessed.get("id"), []).append({"article": row, "similarity": similarity})
+    return similar_by_id
+
+def _load_merge_targets(supabase, targets):
+    """
+    Load what the merge step checks for each similar NewsResult in two
+    queries (per MERGE_TARGET_CHUNK targets) for all of them, instead of two
+    per merge.
     
-    if norm_1 == 0 or norm_2 == 0:
-        return 0  # Handle zero vectors
+    Args:
+        supabase: SupabaseClient
+        targets: NewsResults rows articles will be merged into
         
-    return dot_product / (norm_1 * norm_2)
+    Returns:
+        Tuple of ({NewsResults id: isProcessed} for the rows that still exist,
+        {NewsArticle id: NewsArticle row}, {NewsResult value: [NewsArticle ids]}),
+        where NewsArticle links to its NewsResult by id (as text) or by uniqueName.
+        Merges look rows up by NewsArticle id, so every merge into one article
+        shares the same row.
+    """
+    ids = list(dict.fromkeys(target.get("id") for target in targets))
+    processed_state = {}
+    for start in range(0, len(ids), MERGE_TARGET_CHUNK):
+        response = supabase.client.table("NewsResults").select("id,isProcessed")\
+            .in_("id", ids[start:start + MERGE_TARGET_CHUNK])\
+            .execute()
+        processed_state.update((row["id"], row.get("isProcessed", False)) for row in response.data or [])
+    
+    keys = [str(target_id) for target_id in ids]
+    keys += [target.get("uniqueName") for target in targets if target.get("uniqueName")]
+    keys = list(dict.fromkeys(keys))
+    articles_by_id = {}
+    article_ids_by_news_result = {}
+    for start in range(0, len(keys), MERGE_TARGET_CHUNK):
+        response = supabase.client.table("NewsArticle").select(MERGE_ARTICLE_COLUMNS)\
+            .in_("NewsResult", keys[start:start + MERGE_TARGET_CHUNK])\
+            .execute()
+        for article in response.data or []:
+            articles_by_id[article.get("id")] = article
+            article_ids_by_news_result.setdefault(article.get("NewsResult"), []).append(article.get("id"))
+    
+    return processed_state, articles_by_id, article_ids_by_news_result
 
 async def check_similarity_and_update(threshold=0.89):
     """
@@ -57,11 +189,11 @@ async def check_similarity_and_update(threshold=0.89):
     
     print("\n===== SIMILARITY CHECK =====")
     print(f"Starting similarity check between unprocessed and processed articles with threshold: {threshold}...")
-    supabase = SupabaseClient()
+    supabase = get_supabase()
     llm_dict = initialize_model("openai")  # Use OpenAI for processing combined text
     
     # Get unprocessed news results with embeddings
-    unprocessed_response = supabase.client.table("NewsResults").select("*").eq("isProcessed", False).execute()
+    unprocessed_response = supabase.client.table("NewsResults").select(SIMILARITY_COLUMNS).eq("isProcessed", False).execute()
     if not unprocessed_response.data:
         print("No unprocessed articles to check.")
         print("===== SIMILARITY CHECK COMPLETE =====\n")
@@ -74,83 +206,75 @@ async def check_similarity_and_update(threshold=0.89):
     unprocessed_with_embeddings = [a for a in unprocessed_articles if a.get("embedding")]
     print(f"Of these, {len(unprocessed_with_embeddings)} have embeddings ({len(unprocessed_articles) - len(unprocessed_with_embeddings)} missing embeddings).")
     
-    # Get processed news results with embeddings
-    processed_response = supabase.client.table("NewsResults").select("*").eq("isProcessed", True).execute()
-    if not processed_response.data:
-        print("No processed articles to compare against.")
-        print("===== SIMILARITY CHECK COMPLETE =====\n")
-        return processed_article_ids
+    if USE_PGVECTOR:
+        # Matching runs in the database; processed embeddings never leave it
+        print(f"Matching {len(unprocessed_with_embeddings)} articles with embeddings against processed articles in the database...")
+        scored_rows = None
+        similar_by_id = await asyncio.to_thread(_find_similar_in_database, supabase, unprocessed_articles, threshold)
+    else:
+        # Get processed news results with embeddings
+        processed_response = supabase.client.table("NewsResults").select(SIMILARITY_COLUMNS).eq("isProcessed", True).execute()
+        if not processed_response.data:
+            print("No processed articles to compare against.")
+            print("===== SIMILARITY CHECK COMPLETE =====\n")
+            return processed_article_ids
     
-    processed_articles = processed_response.data
-    processed_with_embeddings = [a for a in processed_articles if a.get("embedding")]
-    print(f"Found {len(processed_articles)} processed articles to compare against.")
-    print(f"Of these, {len(processed_with_embeddings)} have embeddings ({len(processed_articles) - len(processed_with_embeddings)} missing embeddings).")
+        processed_articles = processed_response.data
+        # Embeddings are stacked into matrices below, so text ones are parsed first
+        _decode_embeddings(unprocessed_articles)
+        _decode_embeddings(processed_articles)
+        processed_with_embeddings = [a for a in processed_articles if a.get("embedding")]
+        print(f"Found {len(processed_articles)} processed articles to compare against.")
+        print(f"Of these, {len(processed_with_embeddings)} have embeddings ({len(processed_articles) - len(processed_with_embeddings)} missing embeddings).")
     
-    # Debug output
-    print(f"Starting detailed similarity checks for {len(unprocessed_with_embeddings)} articles with embeddings...")
+        # Debug output
+        print(f"Starting detailed similarity checks for {len(unprocessed_with_embeddings)} articles with embeddings...")
+    
+        # Score all pairs up front instead of one cosine_similarity call per pair
+        scored_rows = similarity_rows(unprocessed_articles, processed_articles, threshold, SIMILARITY_TILE_ROWS)
     
     # Check for similarity between unprocessed and processed articles
     similar_article_found = False
+    candidates = []
     
-    for unprocessed in unprocessed_articles:
-        unprocessed_id = unprocessed.get("id")
-        print(f"Checking unprocessed article: {unprocessed.get('uniqueName')}")
-        unprocessed_url = unprocessed.get("url", "")
+    for unprocessed_index, unprocessed in enumerate(unprocessed_articles):
+        logger.debug("Checking unprocessed article: %s", unprocessed.get("uniqueName"))
         unprocessed_uniquename = unprocessed.get("uniqueName", "")
         
         # Skip articles without embeddings
         if not unprocessed.get("embedding"):
-            print(f"Article {unprocessed_uniquename} has no embedding, skipping similarity check.")
+            logger.debug("Article %s has no embedding, skipping similarity check.", unprocessed_uniquename)
             # Don't add to processed_article_ids so it will be processed normally
             continue
-            
-        unprocessed_embedding = unprocessed.get("embedding")
         
         # Find similar processed articles
-        similar_processed = []
-        for processed in processed_articles:
-            processed_url = processed.get("url", "")
-            processed_uniquename = processed.get("uniqueName", "")
-            
-            # Skip if comparing with self (based on URL or uniqueName)
-            if (processed_url and processed_url == unprocessed_url) or \
-               (processed_uniquename and processed_uniquename == unprocessed_uniquename):
-                print(f"Skipping self-comparison for article {processed.get('id')}")
-                continue
-                
-            if not processed.get("embedding"):
-                continue
-                
-            processed_embedding = processed.get("embedding")
-            
-            # Verify both embeddings have the same dimensions
-            if len(unprocessed_embedding) != len(processed_embedding):
-                print(f"Warning: Embedding dimension mismatch: {len(unprocessed_embedding)} vs {len(processed_embedding)} - skipping comparison")
-                continue
-            
-            # Calculate cosine similarity
-            try:
-                similarity = cosine_similarity(unprocessed_embedding, processed_embedding)
-                print(f"Similarity with article {processed.get('id')}: {similarity:.4f}")
-                
-                if similarity >= threshold:
-                    similar_processed.append({
-                        "article": processed,
-                        "similarity": similarity
-                    })
-                    similar_article_found = True
-                    print(f"Found similar article with similarity score: {similarity:.4f} - ID: {processed.get('uniqueName')}")
-            except Exception as e:
-                print(f"Error calculating similarity: {e}")
-                continue
+        if scored_rows is None:
+            similar_processed = similar_by_id.get(unprocessed.get("id"), [])
+        elif unprocessed_index not in scored_rows:
+            print(f"Warning: No processed embeddings with dimension {len(unprocessed.get('embedding'))} - skipping comparison")
+            continue
+        else:
+            processed_indices, scores = scored_rows[unprocessed_index]
+            similar_processed = _similar_from_scores(processed_articles, processed_indices, scores)
+        
+        for similar in similar_processed:
+            similar_article_found = True
+            print(f"Found similar article with similarity score: {similar['similarity']:.4f} - ID: {similar['article'].get('uniqueName')}")
         
-        # If similar processed articles found, combine content and update
+        if similar_processed:
+            candidates.append((unprocessed, similar_processed))
+    
+    print(f"Checked {len(unprocessed_with_embeddings)} articles with embeddings, {len(candidates)} have similar processed articles.")
+    
+    async def find_merge_target(unprocessed, similar_processed):
+        """
+        Find the NewsArticle an unprocessed article would be merged into: the
+        one behind its most similar processed NewsResult. Returns None when
+        there is none to update and the article should be processed normally.
+        """
         if similar_processed:
             print(f"Found {len(similar_processed)} similar processed articles to {unprocessed.get('uniqueName')}")
             
-            # Sort by similarity score (highest first)
-            similar_processed.sort(key=lambda x: x["similarity"], reverse=True)
-            
             # Get the NewsArticle record for the most similar article
             most_similar = similar_processed[0]["article"]
             most_similar_id = most_similar.get('id')
@@ -163,78 +287,71 @@ async def check_similarity_and_update(threshold=0.89):
             try:
                 # First check if the NewsResult is still marked as processed
                 # This helps verify the article hasn't been deleted and re-ingested
-                news_result_check = supabase.client.table("NewsResults").select("isProcessed").eq("id", most_similar_id).execute()
+                is_processed = processed_state.get(most_similar_id)
                 
-                if not news_result_check.data or len(news_result_check.data) == 0:
+                if is_processed is None:
                     print(f"Warning: NewsResult {most_similar_id} no longer exists in the database!")
                     # Do not mark as processed - let normal pipeline handle it
                     print(f"Will process article {unprocessed.get('uniqueName')} normally")
-                    continue
+                    return None
                     
-                if not news_result_check.data[0].get("isProcessed", False):
+                if not is_processed:
                     print(f"Warning: NewsResult {most_similar_id} is no longer marked as processed!")
                     print("This suggests the article may have been deleted and reingested.")
                     # Let normal pipeline handle it
                     print(f"Will process article {unprocessed.get('uniqueName')} normally")
-                    continue
+                    return None
                 
-                # First look for articles specifically linked to this NewsResult ID
-                article_response = supabase.client.table("NewsArticle").select("*").eq("NewsResult", str(most_similar_id)).execute()
+                # Articles linked to this NewsResult, those linked by ID first
+                article_ids = article_ids_by_news_result.get(str(most_similar_id), []) + \
+                    article_ids_by_news_result.get(most_similar_uniquename, [])
+                articles = [articles_by_id[article_id] for article_id in article_ids]
                 
-                if not article_response.data or len(article_response.data) == 0:
-                    print(f"No article found with NewsResult={most_similar_id}, trying with uniqueName")
-                    article_response = supabase.client.table("NewsArticle").select("*").eq("NewsResult", most_similar_uniquename).execute()
-                
-                # If still no results, try searching through all articles to find a match by URL
-                if not article_response.data or len(article_response.data) == 0:
-                    print(f"No article found with NewsResult={most_similar_uniquename}, will search by URL in all articles")
-                    all_articles_response = supabase.client.table("NewsArticle").select("*").execute()
-                    
-                    if not all_articles_response.data or len(all_articles_response.data) == 0:
-                        print("No articles found in the database at all! The article database might be empty.")
-                        # Process through normal pipeline
-                        print(f"Will process article {unprocessed.get('uniqueName')} normally")
-                        continue
-                        
-                    found_by_url = False
-                    found_article = None
-                    
-                    for article in all_articles_response.data:
-                        source_url = article.get("sourceURL", "")
-                        if most_similar_url and most_similar_url in source_url:
-                            found_article = article
-                            found_by_url = True
-                            print(f"Found article {article.get('id')} by matching URL {most_similar_url} in sourceURL")
-                            break
-                        
-                    if found_by_url and found_article:
-                        article_response = {"data": [found_article]}
-                    else:
-                        print(f"No article found with URL containing {most_similar_url}")
-                        
-                        # Check if the article was potentially deleted
-                        print("Checking if the similar article might have been deleted...")
-                        deleted_check = supabase.client.table("NewsArticle").select("id").eq("Status", "DELETED").execute()
-                        if deleted_check.data and len(deleted_check.data) > 0:
-                            deleted_ids = [item.get("id") for item in deleted_check.data]
-                            print(f"Found {len(deleted_ids)} deleted articles in the database.")
-                            
-                        # Let the article be processed normally since we couldn't find a match to update
-                        print(f"The similar article {most_similar_uniquename} may have been deleted or is otherwise inaccessible.")
-                        print(f"Will process article {unprocessed.get('uniqueName')} normally")
-                        continue
+                # If neither matched, look for an article whose sourceURL contains the URL
+                if not articles and most_similar_url:
+                    print(f"No article found with NewsResult={most_similar_id} or {most_similar_uniquename}, will search by URL")
+                    # Substring match served by the trigram index on sourceURL.
+                    # LIKE wildcards in the URL itself are escaped; PostgREST reads
+                    # "*" as "%", so it is matched as any single character and the
+                    # rows are checked for the exact substring below
+                    url_pattern = most_similar_url.replace("\\", "\\\\").replace("%", "\\%")\
+                        .replace("_", "\\_").replace("*", "_")
+                    article_response = await asyncio.to_thread(
+                        supabase.client.table("NewsArticle").select(MERGE_ARTICLE_COLUMNS)
+                        .like("sourceURL", f"%{url_pattern}%")
+                        .order("id")
+                        .limit(5)
+                        .execute
+                    )
+                    articles = [
+                        article for article in article_response.data or []
+                        if most_similar_url in (article.get("sourceURL") or "")
+                    ][:1]
+                    if articles:
+                        print(f"Found article {articles[0].get('id')} by matching URL {most_similar_url} in sourceURL")
+                        # Keep the cached row if this article was already loaded, so
+                        # merges into it see the content earlier merges wrote
+                        articles = [articles_by_id.setdefault(articles[0].get("id"), articles[0])]
                 
-                if not article_response or not article_response.data or len(article_response.data) == 0:
+                if not articles:
                     print(f"No article found to update for similar article {most_similar_id}")
-                    print("This article appears to have similar content to a processed result but the article is not found.")
-                    print("It may have been deleted or never created properly.")
                     
-                    # Process through normal pipeline
+                    # Check if the article was potentially deleted
+                    print("Checking if the similar article might have been deleted...")
+                    deleted_check = await asyncio.to_thread(
+                        supabase.client.table("NewsArticle").select("id").eq("Status", "DELETED").execute
+                    )
+                    if deleted_check.data and len(deleted_check.data) > 0:
+                        deleted_ids = [item.get("id") for item in deleted_check.data]
+                        print(f"Found {len(deleted_ids)} deleted articles in the database.")
+                    
+                    # Let the article be processed normally since we couldn't find a match to update
+                    print(f"The similar article {most_similar_uniquename} may have been deleted or is otherwise inaccessible.")
                     print(f"Will process article {unprocessed.get('uniqueName')} normally")
-                    continue
+                    return None
                 
                 # Use the found article
-                existing_article = article_response.data[0]
+                existing_article = articles[0]
                 article_id = existing_article.get("id")
                 
                 # Check if the article is archived or deleted
@@ -242,112 +359,168 @@ async def check_similarity_and_update(threshold=0.89):
                 if article_status == "ARCHIVED" or article_status == "DELETED":
                     print(f"Found article {article_id} but its status is {article_status} - cannot update.")
                     print(f"Will process article {unprocessed.get('uniqueName')} normally")
-                    continue
+                    return None
                 
-                # Print debug information about the article we found
-                print(f"Using article ID: {article_id} for update")
-                print(f"Article headline: {existing_article.get('EnglishHeadline')}")
-                print(f"Article source: {existing_article.get('sourceURL')}")
+                return existing_article
                 
-                # Get the source content for the unprocessed article
-                unprocessed_source_url = unprocessed.get("url")
+            except Exception as e:
+                print(f"Error finding article to update: {e}")
+                print(f"Exception traceback: {traceback.format_exc()}")
+                print(f"Will process article {unprocessed.get('uniqueName')} normally")
+                return None
+        return None
+    
+    async def merge_into_similar(unprocessed, similar_processed, existing_article):
+        """Combine an unprocessed article into the existing article found by find_merge_target."""
+        unprocessed_id = unprocessed.get("id")
+        article_id = existing_article.get("id")
+        
+        try:
+            # Print debug information about the article we found
+            print(f"Using article ID: {article_id} for update")
+            print(f"Article headline: {existing_article.get('EnglishHeadline')}")
+            print(f"Article source: {existing_article.get('sourceURL')}")
+            
+            # Get the source content for the unprocessed article
+            unprocessed_source_url = unprocessed.get("url")
+            
+            # Get existing source content
+            existing_source_urls = [existing_article.get("sourceURL")]
+            
+            # Add any additional sources from the similar articles
+            for similar in similar_processed:
+                similar_url = similar["article"].get("url")
+                if similar_url and similar_url not in existing_source_urls:
+                    existing_source_urls.append(similar_url)
+            
+            # Generate new article content by combining sources
+            print(f"Combining content from {len(existing_source_urls) + 1} sources...")
+            
+            # Create a list of all sources for the combined content
+            all_source_urls = existing_source_urls + [unprocessed_source_url]
+            # Filter out None values and duplicates
+            all_source_urls = list(filter(None, dict.fromkeys(all_source_urls)))
+            all_source_urls_str = "\n".join(all_source_urls)
+            
+            # Use LLM to generate combined content
+            try:
+                # Generate combined English content
+                english_prompt = f"""
+                I have multiple news articles about the same event or topic. Please create a comprehensive, 
+                updated article by combining information from all sources. The article should be in English, 
+                well-structured, and maintain a professional journalistic style. 
+                Keep the most essential and newest information, avoid redundancy, and ensure all key details are included.
                 
-                # Get existing source content
-                existing_source_urls = [existing_article.get("sourceURL")]
+                The sources are:
+                {all_source_urls_str}
                 
-                # Add any additional sources from the similar articles
-                for similar in similar_processed:
-                    similar_url = similar["article"].get("url")
-                    if similar_url and similar_url not in existing_source_urls:
-                        existing_source_urls.append(similar_url)
+                The existing article content is:
+                {existing_article.get('EnglishArticle', '')}
                 
-                # Generate new article content by combining sources
-                print(f"Combining content from {len(existing_source_urls) + 1} sources...")
+                Create an updated and enhanced version that incorporates new information from the other sources.
+                """
                 
-                # Create a list of all sources for the combined content
-                all_source_urls = existing_source_urls + [unprocessed_source_url]
-                # Filter out None values and duplicates
-                all_source_urls = list(filter(None, dict.fromkeys(all_source_urls)))
-                all_source_urls_str = "\n".join(all_source_urls)
+                # Generate combined German content
+                german_prompt = f"""
+                I have multiple news articles about the same event or topic. Please create a comprehensive, 
+                updated article by combining information from all sources. The article should be in German, 
+                well-structured, and maintain a professional journalistic style.
+                Keep the most essential and newest information, avoid redundancy, and ensure all key details are included.
                 
-                # Use LLM to generate combined content
-                try:
-                    # Generate combined English content
-                    english_prompt = f"""
-                    I have multiple news articles about the same event or topic. Please create a comprehensive, 
-                    updated article by combining information from all sources. The article should be in English, 
-                    well-structured, and maintain a professional journalistic style. 
-                    Keep the most essential and newest information, avoid redundancy, and ensure all key details are included.
-                    
-                    The sources are:
-                    {all_source_urls_str}
-                    
-                    The existing article content is:
-                    {existing_article.get('EnglishArticle', '')}
-                    
-                    Create an updated and enhanced version that incorporates new information from the other sources.
-                    """
-                    
-                    combined_english_content = generate_text_with_model(llm_dict, english_prompt).strip()
-                    
-                    # Generate combined German content
-                    german_prompt = f"""
-                    I have multiple news articles about the same event or topic. Please create a comprehensive, 
-                    updated article by combining information from all sources. The article should be in German, 
-                    well-structured, and maintain a professional journalistic style.
-                    Keep the most essential and newest information, avoid redundancy, and ensure all key details are included.
-                    
-                    The sources are:
-                    {all_source_urls_str}
-                    
-                    The existing article content is:
-                    {existing_article.get('GermanArticle', '')}
-                    
-                    Create an updated and enhanced version in German that incorporates new information from the other sources.
-                    """
-                    
-                    combined_german_content = generate_text_with_model(llm_dict, german_prompt).strip()
-                    
-                    # Update the existing article
-                    current_time = datetime.datetime.now().isoformat()
-                    
-                    updates = {
-                        "EnglishArticle": combined_english_content,
-                        "GermanArticle": combined_german_content,
-                        "Status": "UPDATED",  # Fixed: Use uppercase "Status" to match schema
-                        # Keep existing headlines
-                        "sourceURL": ", ".join(all_source_urls),  # Combine all source URLs
-                        "created_at": current_time  # Update the creation date to reflect update time
-                    }
+                The sources are:
+                {all_source_urls_str}
+                
+                The existing article content is:
+                {existing_article.get('GermanArticle', '')}
+                
+                Create an updated and enhanced version in German that incorporates new information from the other sources.
+                """
+                
+                # Both languages are generated at the same time
+                combined_english_content, combined_german_content = await asyncio.gather(
+                    asyncio.to_thread(generate_text_with_model, llm_dict, english_prompt),
+                    asyncio.to_thread(generate_text_with_model, llm_dict, german_prompt)
+                )
+                combined_english_content = combined_english_content.strip()
+                combined_german_content = combined_german_content.strip()
+                
+                # Update the existing article
+                current_time = datetime.datetime.now().isoformat()
+                
+                updates = {
+                    "EnglishArticle": combined_english_content,
+                    "GermanArticle": combined_german_content,
+                    "Status": "UPDATED",  # Fixed: Use uppercase "Status" to match schema
+                    # Keep existing headlines
+                    "sourceURL": ", ".join(all_source_urls),  # Combine all source URLs
+                    "created_at": current_time  # Update the creation date to reflect update time
+                }
+                
+                # Update the article
+                print(f"Updating article {article_id} with combined content...")
+                if await update_article(supabase, article_id, updates):
+                    print(f"Successfully updated article {article_id} with combined content")
+                    # Later merges into the same article build on this content
+                    existing_article.update(updates)
                     
-                    # Update the article
-                    print(f"Updating article {article_id} with combined content...")
-                    if await update_article(supabase, article_id, updates):
-                        print(f"Successfully updated article {article_id} with combined content")
-                        
-                        # Mark the unprocessed article as processed
-                        supabase.client.table("NewsResults").update({"isProcessed": True}).eq("id", unprocessed_id).execute()
-                        print(f"Marked unprocessed article {unprocessed.get('uniqueName')} as processed")
-                        
-                        # Add this article to the list of processed articles that should be skipped
-                        processed_article_ids.append(unprocessed_id)
-                    else:
-                        print(f"Failed to update article {article_id}")
-                        print("This could be due to the article being deleted or having restricted permissions.")
-                        print(f"Will process article {unprocessed.get('uniqueName')} normally")
+                    # Mark the unprocessed article as processed
+                    await asyncio.to_thread(
+                        supabase.client.table("NewsResults").update({"isProcessed": True}).eq("id", unprocessed_id).execute
+                    )
+                    print(f"Marked unprocessed article {unprocessed.get('uniqueName')} as processed")
                     
-                except Exception as e:
-                    print(f"Error generating combined content: {e}")
-                    print(f"Exception traceback: {traceback.format_exc()}")
+                    # Add this article to the list of processed articles that should be skipped
+                    processed_article_ids.append(unprocessed_id)
+                else:
+                    print(f"Failed to update article {article_id}")
+                    print("This could be due to the article being deleted or having restricted permissions.")
                     print(f"Will process article {unprocessed.get('uniqueName')} normally")
-                    continue
-                    
+                
             except Exception as e:
-                print(f"Error finding or updating article: {e}")
+                print(f"Error generating combined content: {e}")
                 print(f"Exception traceback: {traceback.format_exc()}")
                 print(f"Will process article {unprocessed.get('uniqueName')} normally")
-                continue
+                return
+                
+        except Exception as e:
+            print(f"Error updating article: {e}")
+            print(f"Exception traceback: {traceback.format_exc()}")
+            print(f"Will process article {unprocessed.get('uniqueName')} normally")
+            return
     
+    async def merge_group(group):
+        # Articles merging into the same existing article go one after another,
+        # so each merge starts from the content the previous one wrote
+        async with merge_sem:
+            for unprocessed, similar_processed, existing_article in group:
+                await merge_into_similar(unprocessed, similar_processed, existing_article)
+    
+    processed_state, articles_by_id, article_ids_by_news_result = {}, {}, {}
+    if candidates:
+        try:
+            processed_state, articles_by_id, article_ids_by_news_result = _load_merge_targets(
+                supabase, [similar_processed[0]["article"] for _, similar_processed in candidates]
+            )
+        except Exception as e:
+            print(f"Error loading articles to merge into: {e}")
+            print("Similar articles will be processed normally")
+            candidates = []
+    
+    # Group merges by the NewsArticle they write to, not by the NewsResult they
+    # matched: different NewsResults can lead to the same article (by link or
+    # through a sourceURL holding several URLs). Merges into one article share
+    # its row in articles_by_id, which each successful merge updates in place.
+    groups = {}
+    for unprocessed, similar_processed in candidates:
+        existing_article = await find_merge_target(unprocessed, similar_processed)
+        if existing_article is None:
+            continue
+        groups.setdefault(existing_article.get("id"), []).append((unprocessed, similar_processed, existing_article))
+    
+    # Merge into different existing articles concurrently
+    merge_sem = asyncio.Semaphore(SIMILARITY_MERGE_CONCURRENCY)
+    await asyncio.gather(*(merge_group(group) for group in groups.values()))
+
     if not similar_article_found:
         print("No similar articles were found with the current threshold.")
     
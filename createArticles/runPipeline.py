@@ -1,6 +1,7 @@
 import os
-import subprocess
+import runpy
 import sys
+import traceback
 
 # Add parent directory to path to import LLMSetup
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -9,26 +10,45 @@ sys.path.insert(0, parent_dir)
 
 from LLMSetup import initialize_model
 
+def run_stage(module):
+    """
+    Run one stage as if started with "python -m". Returns False, after
+    reporting which stage failed and why, if it raised or exited non-zero.
+    """
+    try:
+        runpy.run_module(module, run_name="__main__", alter_sys=True)
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            print(f"Stage {module} exited with {e.code}")
+            return False
+    except Exception as e:
+        print(f"Stage {module} failed: {e}")
+        traceback.print_exc()
+        return False
+    return True
+
 def run_pipeline():
     # Initialize LLM models
     print("Initializing LLM models...")
     models = initialize_model("both")
     
-    # Set environment for subprocess calls
-    env = os.environ.copy()
-    env["PYTHONPATH"] = parent_dir + os.pathsep + env.get("PYTHONPATH", "")
-    
     # Change to the script directory for running the pipeline
     os.chdir(current_dir)
     
-    # Run the modules in sequence
-    subprocess.run(["python", "fetchUnprocessedArticles.py"], check=True, env=env)
-    subprocess.run(["python", "extractContent.py"], check=True, env=env)
-    subprocess.run(["python", "-m", "createArticles.relatedArticles"], check=True, env=env)
-    subprocess.run(["python", "englishArticle.py"], check=True, env=env)
-    subprocess.run(["python", "germanArticle.py"], check=True, env=env)
-    subprocess.run(["python", "getImage.py"], check=True, env=env)
-    subprocess.run(["python", "storeInDB.py"], check=True, env=env)
+    # Run the modules in sequence, in this interpreter: modules imported by
+    # an earlier stage (LLMSetup, the Supabase client, the LLM SDKs) are
+    # loaded only once. A failing stage stops the pipeline.
+    for module in [
+        "createArticles.fetchUnprocessedArticles",
+        "createArticles.extractContent",
+        "createArticles.relatedArticles",
+        "createArticles.englishArticle",
+        "createArticles.germanArticle",
+        "createArticles.getImage",
+        "createArticles.storeInDB"
+    ]:
+        if not run_stage(module):
+            sys.exit(1)
     
     # Remove generated JSON files
     for json_file in [
@@ -36,7 +56,8 @@ def run_pipeline():
         "English_articles.json",
         "German_articles.json",
         "images.json",
-        "enriched_background_articles.json"
+        "enriched_background_articles.json",
+        "enriched_background_articles.jsonl"
     ]:
         if os.path.exists(json_file):
             os.remove(json_file)
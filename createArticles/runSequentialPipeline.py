@@ -2,6 +2,7 @@
 Pipeline for processing articles sequentially, excluding topic assignment.
 """
 import asyncio
+import traceback
 import sys
 import os
 # Add the parent directory to the Python path to allow for absolute imports
@@ -13,9 +14,14 @@ from createArticles.review import check_similarity_and_update
 from createArticles.dataPrep import (
     check_processed_articles_similarity,
     group_similar_articles,
+    load_processed_articles,
     process_article_group
 )
 
+# Article groups processed at once; each one crawls its sources and makes
+# several LLM calls
+GROUP_CONCURRENCY = 3
+
 async def main():
     try:
         # First run similarity check on any unprocessed articles to update existing ones
@@ -45,23 +51,30 @@ async def main():
         groups = group_similar_articles(unprocessed_articles, active_articles, threshold=0.85)
         print(f"Found {len(groups)} group(s) of similar articles.")
         
-        # Process each group sequentially
-        for group in groups:
-            try:
-                group_ids = [article["id"] for article in group]
-                print(f"\nProcessing group with article IDs: {group_ids}")
-                processed_article_ids, news_article_ids = await process_article_group(group)
-                
-            except Exception as e:
-                print(f"Error processing article group {group_ids}: {e}")
-                import traceback
-                print(f"Exception traceback: {traceback.format_exc()}")
-                # Continue with next group even if this one fails
-                continue
+        # Processed embeddings every group compares its new articles against,
+        # fetched once (off the event loop) instead of once per article.
+        # process_article_group adds each group's new articles to it.
+        processed_articles = await asyncio.to_thread(load_processed_articles)
+        
+        # Process groups concurrently, GROUP_CONCURRENCY at a time
+        group_sem = asyncio.Semaphore(GROUP_CONCURRENCY)
+        
+        async def process_group(group):
+            group_ids = [article["id"] for article in group]
+            async with group_sem:
+                try:
+                    print(f"\nProcessing group with article IDs: {group_ids}")
+                    processed_article_ids, news_article_ids = await process_article_group(group, processed_articles)
+                    
+                except Exception as e:
+                    print(f"Error processing article group {group_ids}: {e}")
+                    print(f"Exception traceback: {traceback.format_exc()}")
+                    # Continue with other groups even if this one fails
+        
+        await asyncio.gather(*(process_group(group) for group in groups))
     
     except Exception as e:
         print(f"Error in main processing pipeline: {e}")
-        import traceback
         print(f"Exception traceback: {traceback.format_exc()}")
     
     finally:
@@ -72,7 +85,6 @@ async def main():
             await check_processed_articles_similarity()
         except Exception as e:
             print(f"Error in extended similarity check: {e}")
-            import traceback
             print(f"Exception traceback: {traceback.format_exc()}")
         
         print("\nPipeline completed.")
@@ -9,7 +9,7 @@ import sys
 import os
 # Add parent directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from review import check_similarity_and_update
+from createArticles.review import check_similarity_and_update
 
 async def main():
     print("Starting standalone similarity check...")
@@ -0,0 +1,29 @@
+"""
+Text utility functions for cleaning and processing text content.
+"""
+
+# Straight and curly (\u201c \u201d) double quotes; LLM output often uses the latter
+_LEAD_QUOTES = '"\u201c\u201d'
+
+def clean_text(text: str) -> str:
+    """Remove all '\n' sequences, clean up spacing, and remove leading quotes."""
+    if not text:
+        return text
+    
+    # Most fields are already clean: no '\n' escapes, no whitespace other
+    # than single ASCII spaces (isprintable() is False for every other
+    # whitespace character) and no leading quote. Those only need a trim.
+    if '\\n' not in text and '  ' not in text and text.isprintable() and text[0] not in _LEAD_QUOTES:
+        return text.strip()
+    
+    # Replace literal '\n' sequences with spaces, then collapse every run of
+    # whitespace (real newlines included) to one space and trim the ends.
+    # str.split()/join run in C and split on the same characters as \s.
+    flattened = text.replace('\\n', ' ')
+    cleaned = ' '.join(flattened.split())
+    # Remove leading quotes and space after quote if present; as before, a
+    # quote that only follows leading whitespace is left alone
+    if not flattened[0].isspace():
+        cleaned = cleaned.lstrip(_LEAD_QUOTES).lstrip(' ')
+    
+    return cleaned
\ No newline at end of file
@@ -0,0 +1,30 @@
+-- Load an article for review and drop it if it is missing required content.
+--
+-- Returns the article row as jsonb. When the row does not exist, or when one
+-- of the required text fields is blank, returns NULL; in the latter case the
+-- article is deleted and its NewsResults entry is flipped back to
+-- unprocessed in the same transaction.
+create or replace function review_article(p_id bigint, p_uniq text)
+returns jsonb
+language plpgsql
+as $$
+declare
+    a "NewsArticle"%rowtype;
+begin
+    select * into a from "NewsArticle" where id = p_id;
+    if not found then
+        return null;
+    end if;
+
+    if coalesce(a."EnglishArticle", '') ~ '^\s*$'
+       or coalesce(a."GermanArticle", '') ~ '^\s*$'
+       or coalesce(a."EnglishHeadline", '') ~ '^\s*$'
+       or coalesce(a."GermanHeadline", '') ~ '^\s*$' then
+        delete from "NewsArticle" where id = p_id;
+        update "NewsResults" set "isProcessed" = false where "uniqueName" = p_uniq;
+        return null;
+    end if;
+
+    return to_jsonb(a);
+end;
+$$;
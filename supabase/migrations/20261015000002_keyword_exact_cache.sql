@@ -0,0 +1,8 @@
+-- Exact-match companion to keyword_cache, keyed by the SHA-1 hex digest of
+-- the normalized search query. A hit here skips both the OpenAI embedding
+-- call and the match_keywords vector search.
+create table if not exists keyword_exact_cache (
+    key text primary key,
+    result jsonb,
+    created_at timestamptz not null default now()
+);
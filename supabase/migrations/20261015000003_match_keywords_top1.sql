@@ -0,0 +1,9 @@
+-- Semantic keyword cache lookup used by relatedArticles.query_cache.
+--
+-- query_cache already lets the existing match_keywords RPC filter by
+-- threshold and return only the best match (match_count = 1), so the
+-- function itself is left as deployed; redefining it here could clash with
+-- its return type. This only adds the HNSW index that serves the cosine
+-- distance ORDER BY inside it.
+create index if not exists keyword_cache_embedding_hnsw
+    on keyword_cache using hnsw (embedding vector_cosine_ops);
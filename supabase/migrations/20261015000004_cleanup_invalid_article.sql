@@ -0,0 +1,11 @@
+-- Remove an article that failed review and hand its source back to the
+-- pipeline by resetting NewsResults."isProcessed", atomically and in one
+-- round-trip.
+create or replace function cleanup_invalid_article(p_id bigint, p_unique_name text)
+returns void
+language sql
+as $$
+    delete from "NewsArticle" where id = p_id;
+    update "NewsResults" set "isProcessed" = false where "uniqueName" = p_unique_name;
+$$;
+
@@ -0,0 +1,37 @@
+-- review_article: return only the columns the review reads (required text
+-- fields, the image URL and the team used for backup image search) instead
+-- of the whole NewsArticle row.
+create or replace function review_article(p_id bigint, p_uniq text)
+returns jsonb
+language plpgsql
+as $$
+declare
+    a record;
+begin
+    select "EnglishArticle", "GermanArticle", "EnglishHeadline", "GermanHeadline",
+           "imageUrl", "Team"
+    into a
+    from "NewsArticle"
+    where id = p_id;
+    if not found then
+        return null;
+    end if;
+
+    if coalesce(a."EnglishArticle", '') ~ '^\s*$'
+       or coalesce(a."GermanArticle", '') ~ '^\s*$'
+       or coalesce(a."EnglishHeadline", '') ~ '^\s*$'
+       or coalesce(a."GermanHeadline", '') ~ '^\s*$' then
+        perform cleanup_invalid_article(p_id, p_uniq);
+        return null;
+    end if;
+
+    return jsonb_build_object(
+        'EnglishArticle', a."EnglishArticle",
+        'GermanArticle', a."GermanArticle",
+        'EnglishHeadline', a."EnglishHeadline",
+        'GermanHeadline', a."GermanHeadline",
+        'imageUrl', a."imageUrl",
+        'Team', a."Team"
+    );
+end;
+$$;
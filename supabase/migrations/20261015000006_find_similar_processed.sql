@@ -0,0 +1,33 @@
+-- Similar-article lookup used by review.similarity when
+-- SIMILARITY_USE_PGVECTOR=true.
+--
+-- Returns the processed NewsResults closest to query_embedding whose cosine
+-- similarity is at least match_threshold, most similar first. The HNSW index
+-- serves the ORDER BY, so processed embeddings no longer have to be
+-- downloaded and compared in Python.
+create index if not exists newsresults_embedding_hnsw
+    on "NewsResults" using hnsw (embedding vector_cosine_ops);
+
+create or replace function find_similar_processed(
+    query_embedding vector(1536),
+    match_threshold float,
+    match_count int
+)
+returns table (id bigint, "uniqueName" text, url text, similarity float)
+language plpgsql
+stable
+as $$
+begin
+    return query
+    select
+        nr.id,
+        nr."uniqueName",
+        nr.url,
+        1 - (nr.embedding <=> query_embedding) as similarity
+    from "NewsResults" nr
+    where nr."isProcessed" = true
+      and 1 - (nr.embedding <=> query_embedding) >= match_threshold
+    order by nr.embedding <=> query_embedding
+    limit match_count;
+end;
+$$;
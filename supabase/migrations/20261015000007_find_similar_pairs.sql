@@ -0,0 +1,23 @@
+-- Bulk form of find_similar_processed used by review.similarity when
+-- SIMILARITY_USE_PGVECTOR=true.
+--
+-- Returns, for every unprocessed NewsResults row with an embedding, the
+-- processed rows at or above match_threshold (at most match_count each,
+-- most similar first). One call replaces one find_similar_processed round
+-- trip per unprocessed article; each lateral lookup still uses the HNSW
+-- index on NewsResults.embedding.
+create or replace function find_similar_pairs(
+    match_threshold float,
+    match_count int
+)
+returns table (unprocessed_id bigint, id bigint, "uniqueName" text, url text, similarity float)
+language sql
+stable
+as $$
+    select u.id, p.id, p."uniqueName", p.url, p.similarity
+    from "NewsResults" u
+    cross join lateral find_similar_processed(u.embedding, match_threshold, match_count) p
+    where u."isProcessed" = false
+      and u.embedding is not null
+    order by u.id, p.similarity desc;
+$$;
@@ -0,0 +1,13 @@
+-- Indexes for the NewsArticle lookup in review.similarity's merge step.
+--
+-- The article behind a similar NewsResult is found by NewsResult (ID or
+-- uniqueName) and, failing that, by a substring match on sourceURL. The
+-- trigram index serves that LIKE '%url%' instead of the whole table being
+-- downloaded and scanned in Python.
+create extension if not exists pg_trgm;
+
+create index if not exists newsarticle_newsresult
+    on "NewsArticle" ("NewsResult");
+
+create index if not exists newsarticle_sourceurl_trgm
+    on "NewsArticle" using gin ("sourceURL" gin_trgm_ops);
@@ -0,0 +1,16 @@
+-- Bulk UPDATE for the review pass: p_rows is a JSON array of objects with an
+-- "id" and any of the columns below. Only keys present in a row are written,
+-- and ids with no NewsArticle row are skipped (an upsert would insert them).
+create or replace function update_articles(p_rows jsonb)
+returns void
+language sql
+as $$
+    update "NewsArticle" a
+    set "EnglishHeadline" = case when r ? 'EnglishHeadline' then r->>'EnglishHeadline' else a."EnglishHeadline" end,
+        "GermanHeadline"  = case when r ? 'GermanHeadline'  then r->>'GermanHeadline'  else a."GermanHeadline"  end,
+        "EnglishArticle"  = case when r ? 'EnglishArticle'  then r->>'EnglishArticle'  else a."EnglishArticle"  end,
+        "GermanArticle"   = case when r ? 'GermanArticle'   then r->>'GermanArticle'   else a."GermanArticle"   end,
+        "isReviewed"      = case when r ? 'isReviewed' then (r->>'isReviewed')::boolean else a."isReviewed" end
+    from jsonb_array_elements(p_rows) as r
+    where a.id = (r->>'id')::bigint;
+$$;
@@ -0,0 +1,73 @@
+import random
+import re
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+def test_connected_components_joins_chains():
+    from createArticles.embedding_utils import connected_components
+
+    # A~B and B~C put A and C in one group even though A and C are not similar
+    assert connected_components(3, [(0, 1), (1, 2)]) == [[0, 1, 2]]
+    assert connected_components(5, [(3, 4), (1, 3)]) == [[0], [1, 3, 4], [2]]
+    assert connected_components(2, []) == [[0], [1]]
+
+
+def test_similarity_rows_tiled_matches_untiled():
+    from createArticles.embedding_utils import similarity_rows, is_same_article
+
+    rng = np.random.default_rng(0)
+    processed = [
+        {"id": i, "url": f"https://example.com/{i}", "uniqueName": f"article-{i}",
+         "embedding": rng.normal(size=8).tolist()}
+        for i in range(20)
+    ]
+    # Near-duplicates of processed articles, some of them the same article again
+    unprocessed = [
+        {"id": 100 + i, "url": f"https://example.com/{i}" if i % 3 == 0 else f"https://other.com/{i}",
+         "uniqueName": f"article-{i}" if i % 3 == 1 else f"new-{i}",
+         "embedding": (np.asarray(processed[i]["embedding"]) + rng.normal(scale=0.05, size=8)).tolist()}
+        for i in range(7)
+    ]
+    unprocessed.append({"id": 200, "url": "https://example.com/none", "embedding": None})
+
+    untiled = similarity_rows(unprocessed, processed, 0.9, tile_rows=1000)
+    tiled = similarity_rows(unprocessed, processed, 0.9, tile_rows=3)
+
+    assert untiled.keys() == tiled.keys() == set(range(7))
+    for index, (indices, scores) in untiled.items():
+        np.testing.assert_array_equal(tiled[index][0], indices)
+        np.testing.assert_allclose(tiled[index][1], scores, rtol=1e-6)
+        # An article never matches itself (same URL or uniqueName)
+        assert all(not is_same_article(unprocessed[index], processed[j]) for j in indices)
+        # The rest find the processed article they were derived from
+        if index % 3 == 2:
+            assert index in indices
+
+
+def _clean_text_regex(text):
+    """clean_text as written before it moved from regexes to split/join."""
+    if not text:
+        return text
+    cleaned = re.sub(r'(?:\\n|\s)+', ' ', text)
+    cleaned = re.sub(r'^["“”]+\s*', '', cleaned)
+    return cleaned.strip()
+
+
+def test_clean_text_matches_regex_version():
+    from createArticles.text_utils import clean_text
+
+    samples = [
+        "", "plain text", "  padded  ", "two  spaces", "line\\nbreak", "\\n\\nleading escapes",
+        "real\nnewline\tand tab", '"quoted"', '“curly” quote', '""  double', ' "space then quote',
+        '\\n"escape then quote', '"\\nquote then escape', "nbsp\xa0here", "ctrl\x00char", "\x1cfs\x1d",
+        "trailing\\n", '"', "\u2028line separator",
+    ]
+    alphabet = ['a', ' ', '  ', '\\n', '\n', '\t', '"', '“', '”', '\x0b', '\xa0', '\\', 'n', '\x00']
+    rng = random.Random(0)
+    samples += ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 12))) for _ in range(2000)]
+
+    for sample in samples:
+        assert clean_text(sample) == _clean_text_regex(sample), repr(sample)